@@ -1,16 +1,25 @@
 import streamlit as st
 import asyncio
-import nest_asyncio
+import atexit
+import functools
+import logging
 import os
+import threading
 import time
 from dotenv import load_dotenv
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from langgraph.prebuilt import create_react_agent
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
-# 중복 이벤트 루프 방지
-nest_asyncio.apply()
+logger = logging.getLogger("mcp-client")
+# 루트 로거는 WARNING이고 Streamlit은 자기 로거만 설정하므로 직접 INFO 핸들러를 붙임 (rerun마다 중복 추가 방지)
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
 
 # 환경 변수 로드
 load_dotenv()
@@ -19,11 +28,93 @@ openai_api_key = os.getenv("OPENAI_API_KEY")
 # 제목
 st.title("🧠 LangChain MCP Agent")
 
+# 대화 윈도우 크기: 최근 N~2N개 메시지를 유지하다가 2N을 넘으면 N개만큼 건너뜀
+WINDOW_SIZE = 3
+
+# 이 크기를 넘는 툴 결과(SQL 결과 등)는 앞부분만 남기고 잘라서 전달
+TOOL_RESULT_LIMIT = 2048
+
 # 초기 세션 상태
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = [
         SystemMessage(content="모든 응답은 한국어로 해 주세요.")
     ]
+if "window_start" not in st.session_state:
+    st.session_state.window_start = 1  # SystemMessage 다음 인덱스
+if "chat_view" not in st.session_state:
+    st.session_state.chat_view = []  # 화면 출력용 (role, chat_history 인덱스)
+
+# 💾 메시지 추가: 출력 역할은 추가 시점에 한 번만 판별하고, 툴 호출/결과는 출력 목록에 넣지 않음
+def add_messages(*msgs):
+    history = st.session_state.chat_history
+    for msg in msgs:
+        if isinstance(msg, HumanMessage):
+            st.session_state.chat_view.append(("user", len(history)))
+        elif isinstance(msg, AIMessage) and not msg.tool_calls:
+            st.session_state.chat_view.append(("ai", len(history)))
+        history.append(msg)
+
+# MCP 서버 목록
+MCP_SERVERS = {
+    "pg-mcp-server": {
+        "url": "http://mcp-server:8000/sse",
+        "transport": "sse",
+    }
+}
+
+# 🔁 세션 전용 백그라운드 이벤트 루프 (nest_asyncio 대신 한 번만 생성)
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    if "loop" not in st.session_state:
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        st.session_state.loop = loop
+        st.session_state.loop_thread = thread
+    return st.session_state.loop
+
+def run_async(coro):
+    # 백그라운드 스레드에서도 st.* 호출이 현재 rerun에 연결되도록 컨텍스트 전달
+    ctx = get_script_run_ctx()
+
+    async def with_script_ctx():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return await coro
+
+    return asyncio.run_coroutine_threadsafe(with_script_ctx(), get_event_loop()).result()
+
+# 🧠 ChatOpenAI 클라이언트는 상태가 없으므로 모든 세션과 rerun에서 하나만 생성
+@st.cache_resource
+def get_model(model_name: str = "gpt-4o") -> ChatOpenAI:
+    return ChatOpenAI(model=model_name, openai_api_key=openai_api_key)
+
+# 🧩 MCP 클라이언트 / 에이전트 캐시 (매 턴 재연결 방지)
+async def get_agent():
+    if "agent" not in st.session_state:
+        client = MultiServerMCPClient(MCP_SERVERS)
+        await client.__aenter__()
+        st.session_state.mcp_client = client
+        # 프로세스 종료 시 정리: session_state는 종료 시점에 읽을 수 없으므로 객체를 직접 넘김
+        closer = functools.partial(_close_client_at_exit, client, asyncio.get_running_loop())
+        atexit.register(closer)
+        st.session_state.mcp_client_closer = closer
+        st.session_state.agent = create_react_agent(get_model(), client.get_tools())
+    return st.session_state.agent
+
+async def close_agent():
+    st.session_state.pop("agent", None)
+    client = st.session_state.pop("mcp_client", None)
+    closer = st.session_state.pop("mcp_client_closer", None)
+    if closer is not None:
+        atexit.unregister(closer)
+    if client is not None:
+        try:
+            await client.__aexit__(None, None, None)
+        except Exception as e:
+            logger.error("MCP 클라이언트 종료 중 오류: %s", e)
+
+def _close_client_at_exit(client: MultiServerMCPClient, loop: asyncio.AbstractEventLoop):
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.__aexit__(None, None, None), loop).result(timeout=5)
 
 # 🔄 대화 초기화 버튼
 if st.button("🔄 대화 초기화"):
@@ -32,61 +123,81 @@ if st.button("🔄 대화 초기화"):
         SystemMessage(content="모든 응답은 한국어로 해 주세요.")
     ]
     st.session_state.llm_history = []  # LLM에게 전달할 대화 내용도 초기화
+    st.session_state.window_start = 1
+    st.session_state.chat_view = []
+    run_async(close_agent())  # MCP 연결도 정리
     st.rerun()  # 페이지 새로 고침
 
+# ✂️ LLM에 보낼 메시지 준비
+def _prepare_messages(full_messages, keep_turns=WINDOW_SIZE):
+    # SystemMessage + window_start 이후 대화 (append-only로 늘려서 프롬프트 prefix 유지 → OpenAI 프롬프트 캐시 적중)
+    while len(full_messages) - st.session_state.window_start > 2 * keep_turns:
+        st.session_state.window_start += keep_turns
+    # 윈도우가 ToolMessage에서 시작하면 짝이 되는 AIMessage(tool_calls)까지 포함
+    while (
+        1 < st.session_state.window_start < len(full_messages)
+        and isinstance(full_messages[st.session_state.window_start], ToolMessage)
+    ):
+        st.session_state.window_start -= 1
+
+    prepared = full_messages[0:1]
+    for msg in full_messages[st.session_state.window_start:]:
+        # 큰 툴 결과는 잘라내되 tool_call_id는 유지해서 AIMessage와의 짝이 깨지지 않게 함
+        if isinstance(msg, ToolMessage) and isinstance(msg.content, str) and len(msg.content) > TOOL_RESULT_LIMIT:
+            msg = ToolMessage(
+                content=f"[truncated: {len(msg.content)} bytes, first rows: {msg.content[:512]}]",
+                tool_call_id=msg.tool_call_id,
+                name=msg.name,
+            )
+        prepared.append(msg)
+    return prepared
+
+# 📦 에이전트 결과에서 이번 턴에 추가된 메시지만 꺼냄
+def _new_turn_messages(res, sent_count):
+    # 에이전트 상태는 보낸 메시지 + 새 메시지이므로 앞부분을 건너뜀.
+    # tool_calls가 있는 AIMessage와 ToolMessage도 히스토리에 남겨야 다음 턴의 윈도우/잘라내기가 동작함
+    new_msgs = (res.get('messages') or [])[sent_count:]
+    # 최종 답변(툴 호출 없는 AIMessage)으로 끝나지 않으면 짝이 안 맞는 툴 호출을 남기지 않도록 버림
+    if not new_msgs or not isinstance(new_msgs[-1], AIMessage) or new_msgs[-1].tool_calls:
+        return [AIMessage(content="응답에 문제가 발생했습니다.")]
+    return new_msgs
+
 # ⏳ 에이전트 호출 함수
 async def ask_agent(full_messages):
-    model = ChatOpenAI(model="gpt-4o", openai_api_key=openai_api_key)
-
-    # SystemMessage + 최근 3개 대화만
-    system_msg = full_messages[0:1]
-    dialogue = full_messages[1:]
-    recent_dialogue = dialogue[-3:]
-    trimmed_messages = system_msg + recent_dialogue
+    trimmed_messages = _prepare_messages(full_messages)
 
     # 디버깅: 최종 메시지
     # with st.expander("📄 최종 메시지 (디버깅)", expanded=False):
     #     st.write(trimmed_messages)
 
-    async with MultiServerMCPClient(
-        {
-            "pg-mcp-server": {
-                "url": "http://mcp-server:8000/sse",
-                "transport": "sse",
-            }
-        }
-    ) as client:
-        agent = create_react_agent(model, client.get_tools())
-        start = time.time()
+    agent = await get_agent()
+    start = time.perf_counter_ns()
+    try:
         res = await agent.ainvoke({"messages": trimmed_messages})
-        print("에이전트 응답 시간:", time.time() - start)
-
-        # 전체 응답 구조 보기
-        # with st.expander("🧪 에이전트 응답 구조 (디버깅)", expanded=False):
-        #     st.json(res)
+    except Exception:
+        # 연결이 끊긴 경우 다음 턴에 다시 연결하도록 캐시 제거
+        await close_agent()
+        raise
+    logger.info("agent_ms=%d", (time.perf_counter_ns() - start) // 1_000_000)
 
-        # 실제 응답 메시지 추출
-        if 'messages' in res:
-            for message in reversed(res['messages']):
-                if isinstance(message, AIMessage):
-                    return message
+    # 전체 응답 구조 보기
+    # with st.expander("🧪 에이전트 응답 구조 (디버깅)", expanded=False):
+    #     st.json(res)
 
-        return AIMessage(content="응답에 문제가 발생했습니다.")
+    # 이번 턴에 새로 생긴 메시지 (툴 호출/결과 포함)
+    return _new_turn_messages(res, len(trimmed_messages))
 
 # 💬 채팅 UI: 이전 대화 불러오기
-for msg in st.session_state.chat_history:
-    if isinstance(msg, HumanMessage):
-        with st.chat_message("user"):
-            st.markdown(msg.content)
-    elif isinstance(msg, AIMessage):
-        with st.chat_message("ai"):
-            st.markdown(msg.content)
+history = st.session_state.chat_history
+for role, index in st.session_state.chat_view:
+    with st.chat_message(role):
+        st.markdown(history[index].content)
 
 # 📥 사용자 입력 받기
 user_input = st.chat_input("메시지를 입력하세요.")
 if user_input:
     # 사용자 메시지 추가
-    st.session_state.chat_history.append(HumanMessage(content=user_input))
+    add_messages(HumanMessage(content=user_input))
 
     # 사용자 메시지 출력
     with st.chat_message("user"):
@@ -95,17 +206,16 @@ if user_input:
     # 비동기 AI 응답 처리 함수
     async def process_ai_response():
         # AI 응답 생성 대기
-        ai_msg = await ask_agent(st.session_state.chat_history)
+        new_msgs = await ask_agent(st.session_state.chat_history)
 
-        # 응답 메시지 세션에 저장
-        st.session_state.chat_history.append(ai_msg)
+        # 툴 호출/결과까지 포함해 세션에 저장 (마지막이 최종 AIMessage)
+        add_messages(*new_msgs)
 
         # AI 응답을 출력
-        return ai_msg.content  # 여기에 응답 내용을 반환
+        return new_msgs[-1].content  # 여기에 응답 내용을 반환
 
-    # 비동기 함수 실행
-    loop = asyncio.get_event_loop()
-    ai_msg_content = loop.run_until_complete(process_ai_response())  # 대기 후 결과 받기
+    # 비동기 함수 실행 (세션 전용 이벤트 루프에서)
+    ai_msg_content = run_async(process_ai_response())  # 대기 후 결과 받기
 
     # AI 메시지 출력
     with st.chat_message("ai"):
@@ -1,8 +1,12 @@
 import jwt
+import hmac
+import time
+import hashlib
 import logging
-from datetime import datetime, timedelta
+import orjson
+from datetime import datetime, timezone
 from os import environ
-import pytz
+from jwt.utils import base64url_decode
 
 # Configure logging
 logging.basicConfig(
@@ -10,19 +14,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger("jwt_utils")
 
+_ALGOS = ["HS256"]
+_TOKEN_TTL_SECONDS = 24 * 60 * 60
+
 class JWTUtils:
     def __init__(self, jwt_secret=None):
         self._jwt_secret = jwt_secret or environ.get("JWT_SECRET", "default-secret")  # Secret으로 관리 권장
+        self._key_bytes = self._jwt_secret.encode()
 
     def generate_jwt_token(self, user_id: str) -> str:
-        """Generate a JWT token for the given user_id with KST timezone."""
-        kst = pytz.timezone('Asia/Seoul')
-        current_time = datetime.now(kst)
-        
+        """Generate a JWT token for the given user_id (iat/exp as POSIX seconds)."""
+        issued_at = int(datetime.now(tz=timezone.utc).timestamp())
+
         payload = {
             "user_id": user_id,
-            "iat": current_time,  # Issued at time in KST
-            "exp": current_time + timedelta(hours=24)  # Token expires in 24 hours from issuance
+            "iat": issued_at,  # Issued at time (timezone-independent epoch seconds)
+            "exp": issued_at + _TOKEN_TTL_SECONDS  # Token expires in 24 hours from issuance
         }
         try:
             return jwt.encode(payload, self._jwt_secret, algorithm="HS256")
@@ -30,10 +37,46 @@ class JWTUtils:
             logger.error(f"Failed to generate JWT token for user {user_id}: {e}")
             raise ValueError(f"Failed to generate JWT token: {str(e)}")
 
+    def _verify_hs256(self, token: str) -> dict | None:
+        """Verify an HS256 token with the pre-encoded key.
+
+        Returns the payload only when the signature and every registered claim
+        check out; anything else returns None so PyJWT can produce the error.
+        """
+        try:
+            signing_input, _, signature = token.rpartition(".")
+            header_segment, _, payload_segment = signing_input.partition(".")
+            header = orjson.loads(base64url_decode(header_segment))
+            if header.get("alg") != "HS256":
+                return None
+            expected = hmac.new(
+                self._key_bytes, signing_input.encode("ascii"), hashlib.sha256
+            ).digest()
+            if not hmac.compare_digest(expected, base64url_decode(signature)):
+                return None
+            payload = orjson.loads(base64url_decode(payload_segment))
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+        # nbf/aud need options this path does not implement; PyJWT decides those tokens
+        if not isinstance(payload, dict) or "nbf" in payload or "aud" in payload:
+            return None
+        now = time.time()
+        exp = payload.get("exp")
+        iat = payload.get("iat")
+        if exp is not None and (type(exp) is not int or exp <= now):
+            return None
+        if iat is not None and (type(iat) is not int or iat > now):
+            return None
+        return payload
+
     def verify_jwt_token(self, token: str) -> dict:
         """Verify a JWT token and return the payload."""
         try:
-            payload = jwt.decode(token, self._jwt_secret, algorithms=["HS256"])
+            payload = self._verify_hs256(token)
+            if payload is None:
+                # Fall back to PyJWT for anything the fast path does not accept
+                payload = jwt.decode(token, self._jwt_secret, algorithms=_ALGOS)
             if "user_id" not in payload:
                 raise ValueError("Invalid JWT payload: user_id missing")
             return payload
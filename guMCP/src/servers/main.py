@@ -1,9 +1,18 @@
 import argparse
+import asyncio
 import logging
 import os
 import sys
 from pathlib import Path
 
+# Use the libuv-based event loop when available (server process only; the clients manage their own loops)
+try:
+    import uvloop
+
+    uvloop.install()
+except ImportError:
+    pass
+
 # Configure logging for the main script
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -14,6 +23,8 @@ logger = logging.getLogger("gumcp-server")
 project_root = Path(__file__).parent.parent.parent  # /app
 sys.path.insert(0, str(project_root))
 
+from remote import main as remote_main  # noqa: E402 (needs project_root on sys.path)
+
 def main():
     """Parse arguments and launch the guMCP server"""
     parser = argparse.ArgumentParser(description="guMCP Server")
@@ -23,16 +34,16 @@ def main():
     args = parser.parse_args()
 
     logger.info(f"Starting guMCP server on {args.host}:{args.port}")
-    # Import and run the remote server
-    from remote import main as remote_main
-
-    # Pass the CLI arguments to the remote server
-    sys.argv = [sys.argv[0]]  # Clear existing args
+    logger.info(
+        f"Event loop policy: {asyncio.get_event_loop_policy().__class__.__name__}"
+    )
+    # Pass the CLI arguments to the remote server without touching sys.argv
+    remote_argv = []
     if args.host:
-        sys.argv.extend(["--host", args.host])
+        remote_argv.extend(["--host", args.host])
     if args.port:
-        sys.argv.extend(["--port", str(args.port)])
-    remote_main()
+        remote_argv.extend(["--port", str(args.port)])
+    remote_main(remote_argv)
 
 
 if __name__ == "__main__":
@@ -1,24 +1,35 @@
-import json
+import orjson
 import asyncpg
 import asyncio
 from pathlib import Path
+from types import MappingProxyType
 import logging
-import aiofiles
-from hashlib import sha1
+from hashlib import blake2b
 from contextlib import asynccontextmanager
 
-# Configure logging to match guMCP
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+try:
+    from asyncinotify import Inotify, Mask
+except (ImportError, OSError):  # not installed, or not on Linux
+    Inotify = None
+
+# Handlers are attached in main.py, which routes this logger through its queue listener
 logger = logging.getLogger("pg-mcp.database")
 
+_SQL_SHOW_READ_ONLY = "SHOW transaction_read_only"
+
+class PgConnection(asyncpg.Connection):
+    """Pooled connection that keeps the server's fixed statements prepared (see Database.prepared_sql)."""
+    _prepared = {}  # { sql: PreparedStatement }, replaced per connection in _init_connection
+
 class Database:
-    def __init__(self, config_path="/app/etc/config/pg_connections.json"):
+    def __init__(self, config_path="/app/etc/config/pg_connections.json", prepared_sql=()):
+        self._prepared_sql = tuple(prepared_sql)  # fixed SQL prepared on every pooled connection
         self._pools = {}  # { conn_id: pool }
-        self._connection_map = {}  # { conn_id: conn_str }
+        self._init_locks = {}  # { conn_id: asyncio.Lock }
+        self._connection_map = MappingProxyType({})  # { conn_id: conn_str }, read-only snapshot
         self._config_path = Path(config_path)
         self._last_config_hash = None
+        self._last_config_stat = None  # (st_mtime_ns, st_size)
         self._refresh_task = None
 
     async def start_background_refresh(self):
@@ -27,67 +38,124 @@ class Database:
             logger.info("Started background refresh task")
 
     async def _refresh_loop(self):
-        while True:
+        await self._safe_reload()
+        if Inotify is not None:
             try:
-                await self._reload_config_if_changed()
+                await self._watch_config()
             except Exception as e:
-                logger.error(f"Error during config refresh: {e}")
+                logger.warning("Config watcher unavailable, falling back to polling: %s", e)
+        while True:
             await asyncio.sleep(60)
+            await self._safe_reload()
+
+    async def _watch_config(self):
+        # Watch the directory rather than the file: ConfigMap updates swap a symlink
+        # instead of writing in place. Every event just re-runs the cheap stat check.
+        mask = Mask.MODIFY | Mask.CLOSE_WRITE | Mask.MOVED_TO | Mask.CREATE
+        with Inotify() as inotify:
+            inotify.add_watch(self._config_path.parent, mask)
+            logger.info("Watching %s for config changes", self._config_path.parent)
+            async for _event in inotify:
+                await self._safe_reload()
 
-    def _hash_config(self, content):
-        return sha1(json.dumps(content, sort_keys=True).encode()).hexdigest()
+    async def _safe_reload(self):
+        try:
+            await self._reload_config_if_changed()
+        except Exception as e:
+            logger.error("Error during config refresh: %s", e)
 
     async def _reload_config_if_changed(self):
-        if not self._config_path.exists():
-            logger.warning(f"Config path {self._config_path} not found.")
+        try:
+            stat = self._config_path.stat()
+        except FileNotFoundError:
+            logger.warning("Config path %s not found.", self._config_path)
             return
 
-        async with aiofiles.open(self._config_path, mode='r') as f:
-            content = await f.read()
-            content = json.loads(content)
+        # Skip read/parse entirely while the file is untouched
+        current_stat = (stat.st_mtime_ns, stat.st_size)
+        if current_stat == self._last_config_stat:
+            return
+
+        # Small file, read at most once per change: a direct read beats a thread-pool hop
+        raw = self._config_path.read_bytes()
 
-        current_hash = self._hash_config(content)
+        # Hash the raw bytes so a touch without edits does not trigger a reload
+        current_hash = blake2b(raw, digest_size=16).digest()
         if current_hash == self._last_config_hash:
+            self._last_config_stat = current_stat
             return
+        content = orjson.loads(raw)
 
-        logger.info(f"Detected config map change, updating connections")
+        logger.info("Detected config map change, updating connections")
+        self._last_config_stat = current_stat
         self._last_config_hash = current_hash
-        self._connection_map = content  # { conn_id: conn_str }
+        # Swap in a fresh read-only snapshot; readers never see a half-updated map
+        self._connection_map = MappingProxyType(dict(content))  # { conn_id: conn_str }
 
     def get_connection_string(self, conn_id):
         """Retrieve connection string for the given conn_id."""
-        if conn_id not in self._connection_map:
+        conn_str = self._connection_map.get(conn_id)
+        if conn_str is None:
             raise ValueError(f"Unknown connection ID {conn_id}")
-        return self._connection_map[conn_id]
+        return conn_str
 
     async def initialize(self, conn_id):
         if not conn_id:
             raise ValueError("Connection ID is required")
 
         if conn_id not in self._pools:
-            conn_str = self.get_connection_string(conn_id)
-            logger.info(f"Creating new database connection pool for connection ID {conn_id}")
-            self._pools[conn_id] = await asyncpg.create_pool(
-                conn_str,
-                min_size=2,
-                max_size=4,
-                command_timeout=60.0,
-                server_settings={"default_transaction_read_only": "true"}
-            )
+            # Serialize first-use per conn_id so concurrent callers share one pool
+            lock = self._init_locks.setdefault(conn_id, asyncio.Lock())
+            async with lock:
+                if conn_id not in self._pools:
+                    await self._create_pool(conn_id)
         return self
-    
+
+    async def _init_connection(self, conn):
+        """Runs once per new pooled connection: refuse connections that did not come up read-only."""
+        if await conn.fetchval(_SQL_SHOW_READ_ONLY) != "on":
+            raise RuntimeError("Connection is not read-only; refusing to add it to the pool")
+        # NUMERIC arrives as its text form, so no Decimal ever reaches the JSON serializer's callback
+        await conn.set_type_codec(
+            "numeric", encoder=str, decoder=str, schema="pg_catalog", format="text"
+        )
+        # Prepare the fixed metadata statements up front so the first tool call on this
+        # connection skips the parse/describe round trip
+        conn._prepared = {sql: await conn.prepare(sql) for sql in self._prepared_sql}
+
+    async def _create_pool(self, conn_id):
+        conn_str = self.get_connection_string(conn_id)
+        logger.info("Creating new database connection pool for connection ID %s", conn_id)
+        pool = await asyncpg.create_pool(
+            conn_str,
+            min_size=4,
+            max_size=16,
+            max_inactive_connection_lifetime=300,
+            statement_cache_size=1024,
+            max_cached_statement_lifetime=0,
+            command_timeout=60.0,
+            connection_class=PgConnection,
+            init=self._init_connection,
+            # Read-only sessions are safe to run in parallel; JIT only adds latency to small queries
+            server_settings={"default_transaction_read_only": "true", "jit": "off"}
+        )
+        self._pools[conn_id] = pool
+        return pool
+
     @asynccontextmanager
     async def get_connection(self, conn_id):
-        if conn_id not in self._pools:
+        pool = self._pools.get(conn_id)
+        if pool is None:
             await self.initialize(conn_id)
+            pool = self._pools[conn_id]
 
-        async with self._pools[conn_id].acquire() as conn:
+        async with pool.acquire() as conn:
             yield conn
 
     async def close(self, conn_id=None):
         if conn_id:
             if conn_id in self._pools:
-                logger.info(f"Closing database connection pool for connection ID {conn_id}")
+                logger.info("Closing database connection pool for connection ID %s", conn_id)
                 await self._pools[conn_id].close()
                 del self._pools[conn_id]
         else:
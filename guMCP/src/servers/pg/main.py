@@ -1,30 +1,41 @@
+import os
+import re
+import queue
+import atexit
 import logging
-import json
+import functools
+import orjson
 import asyncio
 import decimal
-import datetime
-import uuid
+import asyncpg
 from pathlib import Path
 from enum import Enum
 from typing import Optional
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
 from mcp.server import Server, NotificationOptions
 from mcp.server.models import InitializationOptions
 from mcp.types import TextContent, Tool
 from .database import Database
 
-def safe_json_serializer(obj):
-    if isinstance(obj, (str, int, float, bool, type(None))):
-        return obj
-    elif isinstance(obj, decimal.Decimal):
-        return str(obj)
-    elif isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
-        return obj.isoformat()
-    elif isinstance(obj, uuid.UUID):
-        return str(obj)
-    elif isinstance(obj, Path):
+def _decode_bytes(obj):
+    return obj.decode('utf-8', errors='replace')
+
+# Exact-type handlers; orjson handles str/int/float/bool/None, datetime/date/time and UUID
+# natively, so only the remaining types reach safe_json_serializer.
+_SERIALIZERS = {
+    decimal.Decimal: str,
+    type(Path()): str,
+    bytes: _decode_bytes,
+    set: list,
+}
+
+def _slow_json_fallback(obj):
+    # Subclasses of the fast-path types, Enum members and plain objects
+    if isinstance(obj, (decimal.Decimal, Path)):
         return str(obj)
     elif isinstance(obj, bytes):
-        return obj.decode('utf-8', errors='replace')
+        return _decode_bytes(obj)
     elif isinstance(obj, set):
         return list(obj)
     elif isinstance(obj, Enum):
@@ -34,373 +45,810 @@ def safe_json_serializer(obj):
     else:
         raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
-# Configure logging
+def safe_json_serializer(obj):
+    fn = _SERIALIZERS.get(type(obj))
+    return fn(obj) if fn is not None else _slow_json_fallback(obj)
+
+def _record_default(obj):
+    # Rows are serialized straight from asyncpg Records, without an intermediate list of dicts
+    if isinstance(obj, asyncpg.Record):
+        return dict(zip(obj.keys(), obj.values()))
+    return safe_json_serializer(obj)
+
+# Configure logging: tool calls only enqueue records, and a listener thread does the stream writes
 SERVICE_NAME = Path(__file__).parent.name
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+_log_queue = queue.SimpleQueue()
+_log_stream = logging.StreamHandler()
+_log_stream.setFormatter(
+    logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 )
+_log_listener = QueueListener(_log_queue, _log_stream)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+for _name in (SERVICE_NAME, "pg-mcp.database"):
+    _logger = logging.getLogger(_name)
+    _logger.setLevel(logging.INFO)
+    _logger.addHandler(QueueHandler(_log_queue))
+    _logger.propagate = False
 logger = logging.getLogger(SERVICE_NAME)
 
+def _text_content_from_bytes(b: bytes) -> TextContent:
+    """
+    Wrap orjson output in a TextContent without re-validating it.
+
+    MCP text content is a str and the transport re-encodes the whole JSON-RPC message
+    itself, so the one bytes -> str decode is unavoidable; what this skips is pydantic
+    validating the (possibly multi-MB) string, which is safe because orjson always emits
+    valid UTF-8. There is no binary content type for tool results that clients render as
+    text, so large results stay on this path rather than going out base64-encoded.
+    """
+    return _text_content(b.decode("utf-8"))
+
+def _text_content(text: str) -> TextContent:
+    """TextContent for text the server built itself (always a valid str), without validation."""
+    return TextContent.model_construct(type="text", text=text)
+
+# Pre-built responses for the fixed success/error payloads (never mutated by callers)
+def _const_response(payload: dict) -> list[TextContent]:
+    return [_text_content_from_bytes(orjson.dumps(payload))]
+
+def _err(msg: str) -> list[TextContent]:
+    """Error response for a dynamic message; orjson is only used to escape the string."""
+    return [_text_content(f'{{"success": false, "error": {orjson.dumps(msg).decode()}}}')]
+
+_RESP_SUCCESS = _const_response({"success": True})
+_RESP_DB_UNAVAILABLE = _const_response({"success": False, "error": "Database connection not available in MCP state"})
+_RESP_NO_CONNID = _const_response({"success": False, "error": "conn_id is required for database operations"})
+_RESP_UNKNOWN_CONN = _const_response({"success": False, "error": "Unknown connection ID"})
+_RESP_POOL_INIT_FAILED = _const_response({"success": False, "error": "Failed to initialize pool for connection ID"})
+_RESP_DISCONNECT_FAILED = _const_response({"success": False, "error": "Error disconnecting connection"})
+_RESP_QUERY_REQUIRED = _const_response({"success": False, "error": "SQL(postgreSQL) query is required"})
+
+# Tool schemas are static, so the list is built once and shared by every session
+_TOOLS = [
+    Tool(
+        name="pg_connect",
+        description="Initialize a connection to a PostgreSQL database using the pre-configured connection ID",
+        inputSchema={
+            "type": "object",
+            "properties": {},
+            "description": "No input parameters required as the connection ID is managed by the server",
+        },
+    ),
+    Tool(
+        name="pg_disconnect",
+        description="Close the connection to a PostgreSQL database using the pre-configured connection ID",
+        inputSchema={
+            "type": "object",
+            "properties": {},
+            "description": "No input parameters required as the connection ID is managed by the server",
+        },
+    ),
+    Tool(
+        name="pg_query",
+        description="Execute a read-only SQL query against a PostgreSQL database",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "SQL query to execute (must be read-only, e.g., SELECT statements)",
+                },
+                "params": {
+                    "type": "array",
+                    "items": {"type": ["string", "number", "boolean", "null"]},
+                    "description": "Optional parameters for the SQL query",
+                    "default": [],
+                },
+            },
+            "required": ["query"],
+        },
+    ),
+    Tool(
+        name="pg_list_schemas",
+        description="List all schemas the current user has USAGE privilege on in the PostgreSQL database",
+        inputSchema={
+            "type": "object",
+            "properties": {},
+            "description": "No input parameters required as this tool uses the current user's privileges",
+        },
+    ),
+    Tool(
+        name="pg_list_tables",
+        description="List all tables in a given schema that the current user has SELECT privilege on in the PostgreSQL database",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "schema": {
+                    "type": "string",
+                    "description": "Name of the schema to list tables from. Defaults to 'inst1' if not provided.",
+                    "default": "inst1"
+                }
+            },
+            "required": [],
+            "description": "Schema name is optional; defaults to 'inst1'",
+        },
+    ),
+    Tool(
+        name="pg_list_table_metadata",
+        description="Get metadata (name, type, comment) of a specific table in a given schema in the PostgreSQL database, if the current user has SELECT privilege",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "schema": {
+                    "type": "string",
+                    "description": "Name of the schema where the table is located. Defaults to 'inst1' if not provided.",
+                    "default": "inst1"
+                },
+                "table_name": {
+                    "type": "string",
+                    "description": "Name of the table to retrieve metadata for."
+                }
+            },
+            "required": ["table_name"],
+            "description": "Returns table metadata (name, type, comment) for a specific table in a schema",
+        },
+    ),
+    Tool(
+        name="pg_list_columns_metadata",
+        description="Get metadata for all columns of a specific table in a given schema in the PostgreSQL database",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "schema": {
+                    "type": "string",
+                    "description": "Name of the schema where the table is located. Defaults to 'inst1' if not provided.",
+                    "default": "inst1"
+                },
+                "table_name": {
+                    "type": "string",
+                    "description": "Name of the table to retrieve column metadata for."
+                }
+            },
+            "required": ["table_name"],
+            "description": "Returns column metadata (name, type, length, nullability, default, comment) for a table in the given schema",
+        },
+    ),
+    Tool(
+        name="pg_count_table_rows",
+        description="Get the number of rows in a specific table within a given schema in the PostgreSQL database. By default this is the planner's estimate (instant, may be slightly off); set exact to true for an exact COUNT(*), which scans the whole table",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "schema": {
+                    "type": "string",
+                    "description": "Name of the schema where the table is located. Defaults to 'inst1' if not provided.",
+                    "default": "inst1"
+                },
+                "table_name": {
+                    "type": "string",
+                    "description": "Name of the table to count rows from."
+                },
+                "exact": {
+                    "type": "boolean",
+                    "description": "Count the rows exactly with COUNT(*) instead of returning the planner's estimate.",
+                    "default": False
+                }
+            },
+            "required": ["table_name"],
+            "description": "Returns the number of rows in the specified table within the given schema, and 'estimated' telling whether it is the planner's estimate or an exact count",
+        },
+    ),
+    Tool(
+        name="pg_sample_table_rows",
+        description="Retrieve sample 3 rows from a specific table in a given schema in the PostgreSQL database",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "schema": {
+                    "type": "string",
+                    "description": "Name of the schema where the table is located. Defaults to 'inst1' if not provided.",
+                    "default": "inst1"
+                },
+                "table_name": {
+                    "type": "string",
+                    "description": "Name of the table to retrieve sample rows from."
+                }
+            },
+            "required": ["table_name"],
+            "description": "Returns the first 3 rows from the specified table in the given schema.",
+        },
+    ),
+    Tool(
+        name="pg_describe_schema",
+        description="Get metadata (name, type, comment) of every table in a given schema together with the metadata of all their columns in a single call. Prefer this over calling pg_list_table_metadata and pg_list_columns_metadata for each table",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "schema": {
+                    "type": "string",
+                    "description": "Name of the schema to describe. Defaults to 'inst1' if not provided.",
+                    "default": "inst1"
+                }
+            },
+            "required": [],
+            "description": "Returns one entry per table the current user has SELECT privilege on, each with a 'columns' list (name, type, length, nullability, default, comment)",
+        },
+    ),
+    Tool(
+        name="pg_catalog_bulk",
+        description="Get the schema list, the table list of a given schema, and the table metadata, column metadata and estimated row count of a specific table in the PostgreSQL database in a single call. Prefer this over calling pg_list_schemas, pg_list_tables, pg_list_table_metadata, pg_list_columns_metadata and pg_count_table_rows one by one",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "schema": {
+                    "type": "string",
+                    "description": "Name of the schema to list tables from and where the table is located. Defaults to 'inst1' if not provided.",
+                    "default": "inst1"
+                },
+                "table_name": {
+                    "type": "string",
+                    "description": "Name of the table to retrieve metadata for. If omitted, only schemas and tables are returned."
+                }
+            },
+            "required": [],
+            "description": "Returns schemas, tables, table_meta, columns and row_count (planner estimate from pg_class.reltuples, null if the table was never analyzed)",
+        },
+    ),
+]
+
+# Fixed metadata SQL; module-level so every call passes the identical string, which is
+# also the key of the per-connection prepared statement (see Database.prepared_sql)
+_SQL_LIST_SCHEMAS = """
+    SELECT schema_name
+    FROM information_schema.schemata
+    WHERE schema_name IN (
+        SELECT nspname
+        FROM pg_namespace
+        WHERE has_schema_privilege(nspname, 'USAGE')
+    )
+    ORDER BY schema_name;
+"""
+
+_SQL_LIST_TABLES = """
+    SELECT table_name
+    FROM information_schema.tables
+    WHERE table_schema = $1
+    AND has_table_privilege(table_schema || '.' || table_name, 'SELECT')
+    ORDER BY table_name;
+"""
+
+_SQL_LIST_TABLE_METADATA = """
+    SELECT table_name,
+        table_type,
+        obj_description(('"' || table_schema || '"."' || table_name || '"')::regclass, 'pg_class') AS table_comment
+    FROM information_schema.tables
+    WHERE table_schema = $1
+    AND table_name = $2
+    AND has_table_privilege(table_schema || '.' || table_name, 'SELECT')
+    ORDER BY table_name;
+"""
+
+_SQL_LIST_COLUMNS_METADATA = """
+    SELECT 
+        column_name,
+        data_type,
+        character_maximum_length,
+        numeric_precision,
+        numeric_scale,
+        is_nullable,
+        column_default,
+        col_description(('"' || table_schema || '"."' || table_name || '"')::regclass, ordinal_position) AS column_comment
+    FROM information_schema.columns
+    WHERE table_schema = $1
+    AND table_name = $2
+    ORDER BY ordinal_position;
+"""
+
+# Tables of a schema with their columns aggregated per table (one round trip instead of N+1)
+_SQL_DESCRIBE_SCHEMA = """
+    SELECT t.table_name,
+        t.table_type,
+        obj_description(('"' || t.table_schema || '"."' || t.table_name || '"')::regclass, 'pg_class') AS table_comment,
+        COALESCE(
+            jsonb_agg(
+                jsonb_build_object(
+                    'column_name', c.column_name,
+                    'data_type', c.data_type,
+                    'character_maximum_length', c.character_maximum_length,
+                    'numeric_precision', c.numeric_precision,
+                    'numeric_scale', c.numeric_scale,
+                    'is_nullable', c.is_nullable,
+                    'column_default', c.column_default,
+                    'column_comment', col_description(('"' || t.table_schema || '"."' || t.table_name || '"')::regclass, c.ordinal_position)
+                ) ORDER BY c.ordinal_position
+            ) FILTER (WHERE c.column_name IS NOT NULL),
+            '[]'::jsonb
+        ) AS columns
+    FROM information_schema.tables t
+    LEFT JOIN information_schema.columns c
+        ON c.table_schema = t.table_schema
+        AND c.table_name = t.table_name
+    WHERE t.table_schema = $1
+    AND has_table_privilege(t.table_schema || '.' || t.table_name, 'SELECT')
+    GROUP BY t.table_schema, t.table_name, t.table_type
+    ORDER BY t.table_name;
+"""
+
+# Everything the per-table metadata tools return, from the catalogs in one round trip.
+# row_count is the planner's reltuples estimate (negative = never analyzed -> NULL).
+_SQL_CATALOG_BULK = """
+    WITH t AS (
+        SELECT c.oid, c.relname, c.relkind, c.reltuples
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = $1
+        AND c.relkind IN ('r', 'p', 'v', 'f')
+        AND has_table_privilege(c.oid, 'SELECT')
+    )
+    SELECT
+        (SELECT COALESCE(jsonb_agg(nspname ORDER BY nspname), '[]'::jsonb)
+            FROM pg_namespace
+            WHERE has_schema_privilege(oid, 'USAGE')) AS schemas,
+        (SELECT COALESCE(jsonb_agg(relname ORDER BY relname), '[]'::jsonb)
+            FROM t) AS tables,
+        (SELECT jsonb_build_object(
+                'table_name', relname,
+                'table_type', CASE relkind WHEN 'v' THEN 'VIEW' WHEN 'f' THEN 'FOREIGN' ELSE 'BASE TABLE' END,
+                'table_comment', obj_description(oid, 'pg_class'))
+            FROM t
+            WHERE relname = $2) AS table_meta,
+        (SELECT COALESCE(
+                jsonb_agg(
+                    jsonb_build_object(
+                        'column_name', a.attname,
+                        'data_type', format_type(a.atttypid, a.atttypmod),
+                        'is_nullable', CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END,
+                        'column_default', pg_get_expr(d.adbin, d.adrelid),
+                        'column_comment', col_description(a.attrelid, a.attnum)
+                    ) ORDER BY a.attnum
+                ),
+                '[]'::jsonb
+            )
+            FROM t
+            JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum > 0 AND NOT a.attisdropped
+            LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+            WHERE t.relname = $2) AS columns,
+        (SELECT CASE WHEN reltuples < 0 THEN NULL ELSE reltuples::bigint END
+            FROM t
+            WHERE relname = $2) AS row_count;
+"""
+
+# Planner row estimate from the last ANALYZE/VACUUM. NULL (-> exact COUNT(*)) when there is none:
+# reltuples < 0 is "never analyzed" on PG14+, relpages = 0 is an empty or (PG13 and older)
+# never-analyzed table, where COUNT(*) is cheap anyway. Only relations that hold rows match.
+_SQL_ESTIMATE_ROWS = """
+    SELECT CASE WHEN c.reltuples < 0 OR c.relpages = 0 THEN NULL ELSE c.reltuples::bigint END
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = $1
+    AND c.relname = $2
+    AND c.relkind IN ('r', 'p', 'm', 'f');
+"""
+
+# Identifiers interpolated into SQL must be plain names (letters, digits, '_' or '$', not starting with a digit)
+_IDENT_RE = re.compile(r"[^\W\d][\w$]*")
+
+def _quote_table(schema: str, table_name: str) -> str:
+    for name in (schema, table_name):
+        if not isinstance(name, str) or not _IDENT_RE.fullmatch(name):
+            raise ValueError(f"Invalid identifier: {name!r}")
+    return f'"{schema}"."{table_name}"'
+
+# The same text per table keeps asyncpg's per-connection statement cache hitting
+@functools.lru_cache(maxsize=256)
+def _count_rows_sql(schema: str, table_name: str) -> str:
+    return f"SELECT COUNT(*) AS row_count FROM {_quote_table(schema, table_name)};"
+
+@functools.lru_cache(maxsize=256)
+def _sample_rows_sql(schema: str, table_name: str) -> str:
+    return f"SELECT * FROM {_quote_table(schema, table_name)} LIMIT 3;"
+
 # Initialize global database
 CONFIG_PATH = Path("/app/etc/config/pg_connections.json")
-global_db = Database(config_path=CONFIG_PATH)
+global_db = Database(
+    config_path=CONFIG_PATH,
+    prepared_sql=(
+        _SQL_LIST_SCHEMAS,
+        _SQL_LIST_TABLES,
+        _SQL_LIST_TABLE_METADATA,
+        _SQL_LIST_COLUMNS_METADATA,
+        _SQL_DESCRIBE_SCHEMA,
+        _SQL_CATALOG_BULK,
+        _SQL_ESTIMATE_ROWS,
+    ),
+)
 logger.info("Global database manager initialized")
 
-def create_server(user_id: str, conn_id: Optional[str] = None) -> Server:
-    server = Server("pg-server")
-    server.user_id = user_id
-    server.conn_id = conn_id
+# Upper bound on rows returned by a single query; larger results are cut off and flagged as truncated
+MAX_ROWS = int(os.environ.get("PG_MAX_ROWS", "10000"))
+CURSOR_PREFETCH = 1000
+
+# Connection-affinity mode: pg_connect pins one pooled connection to the session and the
+# fixed-SQL metadata tools reuse it instead of acquiring/releasing per call. Off by default
+# because every pinned session holds a pool slot until pg_disconnect.
+CONNECTION_AFFINITY = os.environ.get("PG_CONNECTION_AFFINITY", "false").lower() == "true"
+
+# Set once the config refresh task has been scheduled for this process
+_refresh_started = False
+
+# Background pool.close() tasks started by pg_disconnect (held so they are not garbage-collected)
+_closing_pools = set()
+
+async def _pin_connection(server: Server):
+    if CONNECTION_AFFINITY and server._conn is None:
+        pool = global_db._pools[server.conn_id]
+        server._conn = await pool.acquire()
+        # Keep the owning pool: another session sharing the conn_id may unregister it
+        server._conn_pool = pool
+
+async def _release_connection(server: Server) -> bool:
+    """Return the session's pinned connection to the pool it came from; False if none was pinned"""
+    async with server._conn_lock:
+        conn, pool = server._conn, server._conn_pool
+        server._conn = server._conn_pool = None
+        if conn is None:
+            return False
+        # Pool.release resets session state (RESET ALL etc.) before recycling the connection
+        await pool.release(conn)
+        return True
+
+async def close_session(server: Server):
+    """Session teardown hook (called by remote.py when a session ends or expires)"""
+    await _release_connection(server)
+
+@asynccontextmanager
+async def _borrow_connection(server: Server, conn_id: str, fixed_sql: bool):
+    # Only server-defined SQL runs on the pinned connection: arbitrary user SQL could change
+    # session settings (e.g. set_config on default_transaction_read_only), which only the
+    # reset on pool release undoes.
+    if fixed_sql and server._conn is not None and conn_id == server.conn_id:
+        async with server._conn_lock:
+            # Re-check under the lock: the session may have released it while we waited
+            if server._conn is not None:
+                yield server._conn
+                return
+    async with global_db.get_connection(conn_id) as conn:
+        yield conn
 
-    async def execute_query(query: str, conn_id: str, params=None):
-        """
-        Execute a read-only SQL query against the PostgreSQL database.
+async def execute_query(server: Server, query: str, conn_id: str, params=(), fixed_sql: bool = False):
+    """
+    Execute a read-only SQL query against the PostgreSQL database.
+    
+    Args:
+        server: The session's server instance (holds the pinned connection, if any)
+        query: The SQL query to execute (must be read-only)
+            example) select * from table or select * from table where id = $1      
+        conn_id: Connection ID (required)       
+        params: Parameters for the query (optional)
+            example) (5,'Alice')
+        fixed_sql: True for server-defined SQL, which may use the session's pinned connection
         
-        Args:
-            query: The SQL query to execute (must be read-only)
-                example) select * from table or select * from table where id = $1      
-            conn_id: Connection ID (required)       
-            params: Parameters for the query (optional)
-                example) (5,'Alice')
-            
-        Returns:
-            List of TextContent objects containing a JSON string with:
-            - success: True/False indicating query execution status
-            - data: query results as a list of dictionaries (if success)
-            - error: error message (if failure)
-        """
+    Returns:
+        List of TextContent objects containing a JSON string with:
+        - success: True/False indicating query execution status
+        - data: query results as a list of dictionaries, at most MAX_ROWS rows (if success)
+        - truncated: True if the result had more than MAX_ROWS rows (if success)
+        - error: error message (if failure)
+    """
+    
+    if not global_db:
+        return _RESP_DB_UNAVAILABLE
         
-        if not global_db:
+    # Full SQL only at DEBUG; large queries would otherwise dominate the INFO log
+    logger.info("Executing query on connection ID %s (%d chars)", conn_id, len(query))
+    logger.debug("SQL: %s", query)
+
+    # Read-only mode comes from the pool's default_transaction_read_only server setting,
+    # restored by asyncpg's RESET ALL on release, so no per-call SET round trip is needed.
+    async with _borrow_connection(server, conn_id, fixed_sql) as conn:
+        # Execute the query
+        try:
+            if fixed_sql:
+                # Server-defined SQL returns small results: one plain execute, no transaction
+                # round trips. The metadata statements were prepared with the pooled connection.
+                stmt = conn._prepared.get(query)
+                records = await (stmt.fetch(*params) if stmt is not None else conn.fetch(query, *params))
+                truncated = len(records) > MAX_ROWS
+                if truncated:
+                    records = records[:MAX_ROWS]
+            else:
+                # User SQL: stream through a cursor so memory stays bounded by MAX_ROWS
+                # whatever the query returns (cursors need a transaction)
+                records = []
+                truncated = False
+                async with conn.transaction(readonly=True):
+                    async for record in conn.cursor(query, *params, prefetch=CURSOR_PREFETCH):
+                        if len(records) >= MAX_ROWS:
+                            truncated = True
+                            break
+                        records.append(record)
             return [
-                TextContent(
-                    type="text",
-                    text=json.dumps(
-                        {"success": False, "error": "Database connection not available in MCP state"},
-                        indent=2,
-                        default=safe_json_serializer
+                _text_content_from_bytes(
+                    orjson.dumps(
+                        {"success": True, "data": records, "truncated": truncated},
+                        default=_record_default,
+                        option=orjson.OPT_INDENT_2,
                     )
                 )
             ]
-            
-        logger.info(f"Executing query on connection ID {conn_id}: {query}")
-
-        async with global_db.get_connection(conn_id) as conn:
-            # Ensure we're in read-only mode
-            await conn.execute("SET TRANSACTION READ ONLY")
-            # Execute the query
-            try:
-                records = await conn.fetch(query, *(params or []))
-                query_result = [dict(record) for record in records]
-                return [
-                    TextContent(
-                        type="text",
-                        text=json.dumps(
-                            {"success": True, "data": query_result},
-                            indent=2,
-                            default=safe_json_serializer
-                        )
+        except Exception as e:
+            logger.error("Query execution error: %s", e)
+            return _err(str(e))
+
+async def _fetch_scalar(server: Server, query: str, conn_id: str, params=(), estimated: bool = False):
+    """
+    Execute a read-only query that returns a single row count and format it
+    without going through Record -> dict -> JSON.
+
+    Returns:
+        List of TextContent objects with the same shape as execute_query:
+        {"success": true, "data": [{"row_count": <int>, "estimated": <bool>}]}.
+        None if an estimate query returns NULL (no estimate).
+    """
+    logger.info("Executing scalar query on connection ID %s (%d chars)", conn_id, len(query))
+    logger.debug("SQL: %s", query)
+
+    async with _borrow_connection(server, conn_id, fixed_sql=True) as conn:
+        try:
+            stmt = conn._prepared.get(query)
+            val = await (stmt.fetchval(*params) if stmt is not None else conn.fetchval(query, *params))
+            if val is None and estimated:
+                return None
+            flag = "true" if estimated else "false"
+            return [
+                _text_content(f'{{"success": true, "data": [{{"row_count": {int(val)}, "estimated": {flag}}}]}}')
+            ]
+        except Exception as e:
+            logger.error("Query execution error: %s", e)
+            return _err(str(e))
+
+async def describe_schema(server: Server, schema: str, conn_id: str):
+    """
+    Fetch table and column metadata for a whole schema in one round trip.
+
+    Returns:
+        List of TextContent objects containing a JSON string with:
+        - success: True/False indicating query execution status
+        - data: one dictionary per table with a nested 'columns' list (if success)
+        - error: error message (if failure)
+    """
+    logger.info("Describing schema %s on connection ID %s", schema, conn_id)
+
+    async with _borrow_connection(server, conn_id, fixed_sql=True) as conn:
+        try:
+            records = await conn._prepared[_SQL_DESCRIBE_SCHEMA].fetch(schema)
+            # asyncpg returns jsonb as text; decode it so columns nest instead of double-encoding
+            tables = [
+                {
+                    "table_name": r["table_name"],
+                    "table_type": r["table_type"],
+                    "table_comment": r["table_comment"],
+                    "columns": orjson.loads(r["columns"]),
+                }
+                for r in records
+            ]
+            return [
+                _text_content_from_bytes(
+                    orjson.dumps(
+                        {"success": True, "data": tables},
+                        default=safe_json_serializer,
+                        option=orjson.OPT_INDENT_2,
                     )
-                ]
-            except Exception as e:
-                logger.error(f"Query execution error: {e}")
-                return [
-                    TextContent(
-                        type="text",
-                        text=json.dumps(
-                            {"success": False, "error": str(e)},
-                            indent=2,
-                            default=safe_json_serializer
-                        )
+                )
+            ]
+        except Exception as e:
+            logger.error("Query execution error: %s", e)
+            return _err(str(e))
+
+async def catalog_bulk(server: Server, schema: str, table_name: Optional[str], conn_id: str):
+    """
+    Fetch schemas, tables, table metadata, column metadata and the estimated row count in one round trip.
+
+    Returns:
+        List of TextContent objects containing a JSON string with:
+        - success: True/False indicating query execution status
+        - data: dictionary with schemas, tables, table_meta, columns and row_count (if success)
+        - error: error message (if failure)
+    """
+    logger.info("Fetching catalog of %s.%s on connection ID %s", schema, table_name, conn_id)
+
+    async with _borrow_connection(server, conn_id, fixed_sql=True) as conn:
+        try:
+            r = await conn._prepared[_SQL_CATALOG_BULK].fetchrow(schema, table_name)
+            # asyncpg returns jsonb as text; decode it so the sections nest instead of double-encoding
+            data = {
+                "schemas": orjson.loads(r["schemas"]),
+                "tables": orjson.loads(r["tables"]),
+                "table_meta": orjson.loads(r["table_meta"]) if r["table_meta"] is not None else None,
+                "columns": orjson.loads(r["columns"]),
+                "row_count": r["row_count"],
+            }
+            return [
+                _text_content_from_bytes(
+                    orjson.dumps(
+                        {"success": True, "data": data},
+                        default=safe_json_serializer,
+                        option=orjson.OPT_INDENT_2,
                     )
-                ]        
+                )
+            ]
+        except Exception as e:
+            logger.error("Query execution error: %s", e)
+            return _err(str(e))
+
+# Tool handlers: each takes (arguments, server) and returns the tool's TextContent list
+def _requires_conn(handler):
+    """Restrict database-related tools if conn_id is not provided"""
+    @functools.wraps(handler)
+    async def wrapper(args: dict, server: Server) -> list[TextContent]:
+        if not server.conn_id:
+            return _RESP_NO_CONNID
+        return await handler(args, server)
+    return wrapper
+
+@_requires_conn
+async def _h_pg_connect(args: dict, server: Server) -> list[TextContent]:
+    try:
+        # Pool already up (this or another session): nothing to create
+        if server.conn_id in global_db._pools:
+            await _pin_connection(server)
+            return _RESP_SUCCESS
+        if server.conn_id not in global_db._connection_map:
+            return _RESP_UNKNOWN_CONN
+        try:
+            await global_db.initialize(server.conn_id)
+            await _pin_connection(server)
+            return _RESP_SUCCESS
+        except Exception as e:
+            logger.error("Failed to initialize pool for connection ID %s: %s", server.conn_id, e)
+            return _RESP_POOL_INIT_FAILED
+    except Exception as e:
+        logger.error("Failed to pg_connect %s: %s", server.conn_id, e)
+        return _err(str(e))
+
+async def _close_pool(conn_id: str, pool: asyncpg.Pool):
+    try:
+        await pool.close()
+        logger.info("Successfully disconnected and removed database connection pool with ID: %s", conn_id)
+    except Exception as e:
+        logger.error("Error disconnecting connection %s: %s", conn_id, e)
+
+@_requires_conn
+async def _h_pg_disconnect(args: dict, server: Server) -> list[TextContent]:
+    try:
+        released = await _release_connection(server)
+    except Exception as e:
+        logger.error("Error disconnecting connection %s: %s", server.conn_id, e)
+        return _RESP_DISCONNECT_FAILED
+    # Unregister so no new caller picks the pool up, then let it drain in the background
+    pool = global_db._pools.pop(server.conn_id, None)
+    if pool is None:
+        # Another session sharing the conn_id already closed the pool
+        return _RESP_SUCCESS if released else _RESP_UNKNOWN_CONN
+    task = asyncio.create_task(_close_pool(server.conn_id, pool))
+    _closing_pools.add(task)
+    task.add_done_callback(_closing_pools.discard)
+    return _RESP_SUCCESS
+
+@_requires_conn
+async def _h_pg_query(args: dict, server: Server) -> list[TextContent]:
+    if "query" not in args:
+        return _RESP_QUERY_REQUIRED
+    query = args["query"]
+    # inputSchema declares params as an array; anything else is left for asyncpg to reject
+    params = args.get("params") or ()
+    # Execute the query using the connection ID 
+    return await execute_query(server, query, server.conn_id, params)
+
+@_requires_conn
+async def _h_pg_list_schemas(args: dict, server: Server) -> list[TextContent]:
+    # Execute the query using the connection ID 
+    return await execute_query(server, _SQL_LIST_SCHEMAS, server.conn_id, fixed_sql=True)
+
+@_requires_conn
+async def _h_pg_list_tables(args: dict, server: Server) -> list[TextContent]:
+    schema = args.get("schema", "public")
+    params = [schema]
+    return await execute_query(server, _SQL_LIST_TABLES, server.conn_id, params, fixed_sql=True)
+
+@_requires_conn
+async def _h_pg_list_table_metadata(args: dict, server: Server) -> list[TextContent]:
+    schema = args.get("schema", "public")
+    table_name = args.get("table_name")
+    params = [schema, table_name]
+    return await execute_query(server, _SQL_LIST_TABLE_METADATA, server.conn_id, params, fixed_sql=True)
+
+@_requires_conn
+async def _h_pg_list_columns_metadata(args: dict, server: Server) -> list[TextContent]:
+    schema = args.get("schema", "public")
+    table_name = args["table_name"]  # 필수
+    params = [schema, table_name]
+    return await execute_query(server, _SQL_LIST_COLUMNS_METADATA, server.conn_id, params, fixed_sql=True)
+
+@_requires_conn
+async def _h_pg_count_table_rows(args: dict, server: Server) -> list[TextContent]:
+    schema = args.get("schema", "public")
+    table_name = args["table_name"]  # 필수
+
+    # 기본은 pg_class.reltuples 추정치 (전체 스캔 없음), 추정치가 없거나 exact면 COUNT(*)
+    if not args.get("exact", False):
+        result = await _fetch_scalar(
+            server, _SQL_ESTIMATE_ROWS, server.conn_id, (schema, table_name), estimated=True
+        )
+        if result is not None:
+            return result
+
+    query = _count_rows_sql(schema, table_name)
+    return await _fetch_scalar(server, query, server.conn_id)
+
+@_requires_conn
+async def _h_pg_sample_table_rows(args: dict, server: Server) -> list[TextContent]:
+    schema = args.get("schema", "public")
+    table_name = args["table_name"]  # 필수
+
+    query = _sample_rows_sql(schema, table_name)
+    return await execute_query(server, query, server.conn_id, fixed_sql=True)
+
+@_requires_conn
+async def _h_pg_describe_schema(args: dict, server: Server) -> list[TextContent]:
+    schema = args.get("schema", "public")
+    return await describe_schema(server, schema, server.conn_id)
+
+@_requires_conn
+async def _h_pg_catalog_bulk(args: dict, server: Server) -> list[TextContent]:
+    schema = args.get("schema", "public")
+    table_name = args.get("table_name")
+    return await catalog_bulk(server, schema, table_name, server.conn_id)
+
+_HANDLERS = {
+    "pg_connect": _h_pg_connect,
+    "pg_disconnect": _h_pg_disconnect,
+    "pg_query": _h_pg_query,
+    "pg_list_schemas": _h_pg_list_schemas,
+    "pg_list_tables": _h_pg_list_tables,
+    "pg_list_table_metadata": _h_pg_list_table_metadata,
+    "pg_list_columns_metadata": _h_pg_list_columns_metadata,
+    "pg_count_table_rows": _h_pg_count_table_rows,
+    "pg_sample_table_rows": _h_pg_sample_table_rows,
+    "pg_describe_schema": _h_pg_describe_schema,
+    "pg_catalog_bulk": _h_pg_catalog_bulk,
+}
+
+def create_server(user_id: str, conn_id: Optional[str] = None) -> Server:
+    server = Server("pg-server")
+    server.user_id = user_id
+    server.conn_id = conn_id
+    server._conn = None  # pinned connection (connection-affinity mode only)
+    server._conn_pool = None  # pool the pinned connection was acquired from
+    server._conn_lock = asyncio.Lock()
+
     @server.list_tools()
     async def handle_list_tools() -> list:
-        return [
-                Tool(
-                    name="pg_connect",
-                    description="Initialize a connection to a PostgreSQL database using the pre-configured connection ID",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {},
-                        "description": "No input parameters required as the connection ID is managed by the server",
-                    },
-                ),
-                Tool(
-                    name="pg_disconnect",
-                    description="Close the connection to a PostgreSQL database using the pre-configured connection ID",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {},
-                        "description": "No input parameters required as the connection ID is managed by the server",
-                    },
-                ),
-                Tool(
-                    name="pg_query",
-                    description="Execute a read-only SQL query against a PostgreSQL database",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "query": {
-                                "type": "string",
-                                "description": "SQL query to execute (must be read-only, e.g., SELECT statements)",
-                            },
-                            "params": {
-                                "type": "array",
-                                "items": {"type": ["string", "number", "boolean", "null"]},
-                                "description": "Optional parameters for the SQL query",
-                                "default": [],
-                            },
-                        },
-                        "required": ["query"],
-                    },
-                ),
-                Tool(
-                    name="pg_list_schemas",
-                    description="List all schemas the current user has USAGE privilege on in the PostgreSQL database",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {},
-                        "description": "No input parameters required as this tool uses the current user's privileges",
-                    },
-                ),
-                Tool(
-                    name="pg_list_tables",
-                    description="List all tables in a given schema that the current user has SELECT privilege on in the PostgreSQL database",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "schema": {
-                                "type": "string",
-                                "description": "Name of the schema to list tables from. Defaults to 'inst1' if not provided.",
-                                "default": "inst1"
-                            }
-                        },
-                        "required": [],
-                        "description": "Schema name is optional; defaults to 'inst1'",
-                    },
-                ),
-                Tool(
-                    name="pg_list_table_metadata",
-                    description="Get metadata (name, type, comment) of a specific table in a given schema in the PostgreSQL database, if the current user has SELECT privilege",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "schema": {
-                                "type": "string",
-                                "description": "Name of the schema where the table is located. Defaults to 'inst1' if not provided.",
-                                "default": "inst1"
-                            },
-                            "table_name": {
-                                "type": "string",
-                                "description": "Name of the table to retrieve metadata for."
-                            }
-                        },
-                        "required": ["table_name"],
-                        "description": "Returns table metadata (name, type, comment) for a specific table in a schema",
-                    },
-                ),
-                Tool(
-                    name="pg_list_columns_metadata",
-                    description="Get metadata for all columns of a specific table in a given schema in the PostgreSQL database",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "schema": {
-                                "type": "string",
-                                "description": "Name of the schema where the table is located. Defaults to 'inst1' if not provided.",
-                                "default": "inst1"
-                            },
-                            "table_name": {
-                                "type": "string",
-                                "description": "Name of the table to retrieve column metadata for."
-                            }
-                        },
-                        "required": ["table_name"],
-                        "description": "Returns column metadata (name, type, length, nullability, default, comment) for a table in the given schema",
-                    },
-                ),
-                Tool(
-                    name="pg_count_table_rows",
-                    description="Get the number of rows in a specific table within a given schema in the PostgreSQL database",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "schema": {
-                                "type": "string",
-                                "description": "Name of the schema where the table is located. Defaults to 'inst1' if not provided.",
-                                "default": "inst1"
-                            },
-                            "table_name": {
-                                "type": "string",
-                                "description": "Name of the table to count rows from."
-                            }
-                        },
-                        "required": ["table_name"],
-                        "description": "Returns the total number of rows in the specified table within the given schema",
-                    },
-                ),
-                Tool(
-                    name="pg_sample_table_rows",
-                    description="Retrieve sample 3 rows from a specific table in a given schema in the PostgreSQL database",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "schema": {
-                                "type": "string",
-                                "description": "Name of the schema where the table is located. Defaults to 'inst1' if not provided.",
-                                "default": "inst1"
-                            },
-                            "table_name": {
-                                "type": "string",
-                                "description": "Name of the table to retrieve sample rows from."
-                            }
-                        },
-                        "required": ["table_name"],
-                        "description": "Returns the first 3 rows from the specified table in the given schema.",
-                    },
-                ),
-            ]
+        return _TOOLS
 
     @server.call_tool()
     async def handle_call_tool(name: str, arguments: dict | None) -> list[TextContent]:
-        logger.info(f"User {server.user_id} calling tool: {name} with arguments: {arguments}")
+        logger.info("User %s calling tool: %s", server.user_id, name)
+        logger.debug("Tool %s arguments: %s", name, arguments)
         if arguments is None:
             arguments = {}
 
-        # Restrict database-related tools if conn_id is not provided
-        if not server.conn_id:
-            return [TextContent(type="text", text=json.dumps({"success": False, "error": "conn_id is required for database operations"}))]
+        handler = _HANDLERS.get(name)
+        if not handler:
+            return [_text_content(f"Unknown tool: {name}")]
         try:
-            match name:
-                case "pg_connect":
-                    try:                  
-                        if server.conn_id not in global_db._connection_map:
-                            return [TextContent(type="text", text=json.dumps({"success": False, "error": "Unknown connection ID"}))]
-                        if server.conn_id not in global_db._pools:
-                            try:
-                                await global_db.initialize(server.conn_id)
-                                return [TextContent(type="text", text=json.dumps({"success": True}))]
-                            except Exception as e:
-                                logger.error(f"Failed to initialize pool for connection ID {conn_id}: {e}")
-                                return [TextContent(type="text", text=json.dumps({"success": False, "error": "Failed to initialize pool for connection ID"}))]
-                    except Exception as e:
-                        logger.error(f"Failed to pg_connect {conn_id}: {e}")
-                        return [TextContent(type="text", text=json.dumps({"success": False, "error": str(e)}))]
-
-                case "pg_disconnect":
-                    try:
-                        if server.conn_id not in global_db._pools:
-                            return [TextContent(type="text", text=json.dumps({"success": False, "error": "Unknown connection ID"}))]
-                        try:
-                            await global_db._pools[server.conn_id].close()
-                            del global_db._pools[server.conn_id]
-                            logger.info(f"Successfully disconnected and removed database connection pool with ID: {server.conn_id}")
-                            return [TextContent(type="text", text=json.dumps({"success": True}))]
-                        except Exception as e:
-                            logger.error(f"Error disconnecting connection {server.conn_id}: {e}")
-                            return [TextContent(type="text", text=json.dumps({"success": False, "error": "Error disconnecting connection"}))]
-                    except Exception as e:
-                        logger.error(f"Failed to pg_connect {server.conn_id}: {e}")
-                        return [TextContent(type="text", text=json.dumps({"success": False, "error": str(e)}))] 
-
-                case "pg_query":
-                    if "query" not in arguments:
-                        return [TextContent(type="text", text=json.dumps({"success": False, "error": "SQL(postgreSQL) query is required"}))]
-                    query = arguments["query"]
-                    params = arguments.get("params",None)
-                    # params가 단일 값이면 리스트로 변환
-                    if params is not None and not isinstance(params, (list, tuple)):
-                        params = [params]
-                    # Execute the query using the connection ID 
-                    return await execute_query(query, server.conn_id, params)
-
-                case "pg_list_schemas":
-                    query = """
-                    SELECT schema_name
-                    FROM information_schema.schemata
-                    WHERE schema_name IN (
-                        SELECT nspname
-                        FROM pg_namespace
-                        WHERE has_schema_privilege(nspname, 'USAGE')
-                    )
-                    ORDER BY schema_name;                   
-                    """
-                    # Execute the query using the connection ID 
-                    return await execute_query(query, server.conn_id, None)
-                case "pg_list_tables":
-                    schema = arguments.get("schema", "public")
-                    query = """
-                        SELECT table_name
-                        FROM information_schema.tables
-                        WHERE table_schema = $1
-                        AND has_table_privilege(table_schema || '.' || table_name, 'SELECT')
-                        ORDER BY table_name;
-                    """
-                    params = [schema]
-                    return await execute_query(query, server.conn_id, params)
-
-                case "pg_list_table_metadata":
-                    schema = arguments.get("schema", "public")
-                    table_name = arguments.get("table_name")
-                    query = """
-                        SELECT table_name,
-                            table_type,
-                            obj_description(('"' || table_schema || '"."' || table_name || '"')::regclass, 'pg_class') AS table_comment
-                        FROM information_schema.tables
-                        WHERE table_schema = $1
-                        AND table_name = $2
-                        AND has_table_privilege(table_schema || '.' || table_name, 'SELECT')
-                        ORDER BY table_name;
-                    """
-                    params = [schema, table_name]
-                    return await execute_query(query, server.conn_id, params)
-
-                case "pg_list_columns_metadata":
-                    schema = arguments.get("schema", "public")
-                    table_name = arguments["table_name"]  # 필수
-
-                    query = """
-                        SELECT 
-                            column_name,
-                            data_type,
-                            character_maximum_length,
-                            numeric_precision,
-                            numeric_scale,
-                            is_nullable,
-                            column_default,
-                            col_description(('"' || table_schema || '"."' || table_name || '"')::regclass, ordinal_position) AS column_comment
-                        FROM information_schema.columns
-                        WHERE table_schema = $1
-                        AND table_name = $2
-                        ORDER BY ordinal_position;
-                    """
-                    params = [schema, table_name]
-                    return await execute_query(query, server.conn_id, params) 
-
-                case "pg_count_table_rows":
-                    schema = arguments.get("schema", "public")
-                    table_name = arguments["table_name"]  # 필수
-
-                    query = f"""
-                        SELECT COUNT(*) AS row_count
-                        FROM "{schema}"."{table_name}";
-                    """
-                    return await execute_query(query, server.conn_id)
-
-                case "pg_sample_table_rows":
-                    schema = arguments.get("schema", "public")
-                    table_name = arguments["table_name"]  # 필수
-
-                    query = f"""
-                        SELECT * FROM "{schema}"."{table_name}" LIMIT 3;
-                    """
-                    return await execute_query(query, server.conn_id)
-                case _:
-                    return [TextContent(type="text", text=f"Unknown tool: {name}")]
+            return await handler(arguments, server)
         except Exception as e:
-            logger.error(f"Error calling tool {name} for user {server.user_id}: {e}")
-            return [TextContent(type="text", text=json.dumps({"success": False, "error": str(e)}))]
+            logger.error("Error calling tool %s for user %s: %s", name, server.user_id, e)
+            return _err(str(e))
 
-    asyncio.create_task(global_db.start_background_refresh())
+    # create_server runs once per MCP session; the config refresh loop is process-wide
+    global _refresh_started
+    if not _refresh_started:
+        _refresh_started = True
+        asyncio.create_task(global_db.start_background_refresh())
     return server
 
 server = create_server
@@ -3,11 +3,11 @@ import uvicorn
 import argparse
 import importlib.util
 import os
+import functools
 import sys
 from pathlib import Path
-import threading
 
-from starlette.routing import Route
+from starlette.routing import Mount, Route
 from starlette.applications import Starlette
 from starlette.responses import JSONResponse, Response
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -20,6 +20,10 @@ from starlette.responses import StreamingResponse
 
 import time
 import asyncio
+import hashlib
+import orjson
+from collections import OrderedDict
+from cachetools import TTLCache
 
 # Configure logging
 logging.basicConfig(
@@ -38,6 +42,8 @@ servers = {}
 # Store user-specific SSE transports and server instances
 user_session_transports = {}
 user_server_instances = {}
+# Open SSE streams per session key; the session's transport is dropped when the last one closes
+user_session_streams = {}
 
 # Prometheus metrics
 active_connections = Gauge(
@@ -46,91 +52,135 @@ active_connections = Gauge(
 connection_total = Counter(
     "gumcp_connection_total", "Total number of SSE connections", ["server"]
 )
+# Labeled active_connections children, resolved once per discovered server
+_server_active = {}
+# Per-server route Mounts, so servers that fail to load at startup can be unrouted
+_server_mounts = {}
 
 # Default metrics port
 METRICS_PORT = 9091
 
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson"""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+# Endpoints that bypass authentication and session tracking
+_SKIP_PATHS = frozenset({"/metrics", "/", "/health_check", "/token"})
+
 # Initialize JWT utils
 jwt_utils = JWTUtils()
 
+# Recently verified tokens: blake2b-128(token) -> (payload, exp). Only successful verifications
+# are stored, and exp is re-checked on every hit so a cached token still expires on time.
+_token_cache = TTLCache(maxsize=10000, ttl=10)
+
 
 class SessionTimeoutMiddleware(BaseHTTPMiddleware):
+    # Instance built by Starlette for the app (the stack is built before startup handlers run)
+    instance = None
+
     def __init__(self, app, timeout_seconds=3600):
         super().__init__(app)
         self.timeout_seconds = timeout_seconds
-        self.session_timestamps = {}  # {session_key: last_active_time}
+        # {session_key: last_active_time (monotonic)}, kept in least-recently-active order
+        self.session_timestamps: OrderedDict[str, float] = OrderedDict()
+        self._cleanup_task: asyncio.Task | None = None
+        self._sessions_added = asyncio.Event()  # wakes the idle cleanup loop
+        SessionTimeoutMiddleware.instance = self
+
+    def ensure_started(self):
+        """Start the idle-session cleanup loop (called once from the app's startup event)"""
+        if self._cleanup_task is None or self._cleanup_task.done():
+            self._cleanup_task = asyncio.create_task(self.cleanup_task())
+
+    def _touch(self, session_key):
+        if not self.session_timestamps:
+            self._sessions_added.set()
+        self.session_timestamps[session_key] = time.monotonic()
+        self.session_timestamps.move_to_end(session_key)
 
     async def dispatch(self, request, call_next):
-        # Skip authentication for metrics, root, health check, and token endpoints
-        if request.url.path in ["/metrics", "/", "/health_check", "/token"]:
-            return await call_next(request)
-        session_key = None
-        # logger.info(f"Entering dispatch for URL={request.url.path}, method={request.method}, params= {request.path_params}")
-        server_name = request.url.path.split("/")[1]
-        session_param = request.url.path.split("/")[2]
-        session_key = f"{server_name}:{session_param}"
-        self.session_timestamps[session_key] = time.time()
         response = await call_next(request)
 
-        # Update timestamp on message receipt for POST requests to /messages/
-        if request.method == "POST" and request.url.path.endswith("/messages/"):
-            if session_key in self.session_timestamps:
-                self.session_timestamps[session_key] = time.time()
-
-        # Start cleanup task only once
-        if session_key and not hasattr(self, "cleanup_task_started"):
-            self.cleanup_task_started = True
-            asyncio.create_task(self.cleanup_task())
+        # The SSE and message handlers tag the scope with their session key; other routes don't
+        session_key = request.scope.get("session_key")
+        if session_key is not None:
+            self._touch(session_key)
 
         return response
 
     async def cleanup_task(self):
         while True:
-            current_time = time.time()
-            expired_sessions = [
-                key
-                for key, ts in self.session_timestamps.items()
-                if current_time - ts > self.timeout_seconds
-            ]
-            for key in expired_sessions:
-                if key in user_session_transports:
-                    transport = user_session_transports.pop(key)
-                    if key in user_server_instances:
-                        del user_server_instances[key]
-                    active_connections.labels(server=key.split(":")[0]).dec()
-                    logger.info(f"Cleaned up idle session: {key}")
-                    del self.session_timestamps[key]
-            await asyncio.sleep(300)  # Check every minute
+            if not self.session_timestamps:
+                # Nothing to expire: sleep until a session shows up
+                self._sessions_added.clear()
+                await self._sessions_added.wait()
+                continue
+            # Oldest activity is at the front, so it is always the next session to expire
+            key, ts = next(iter(self.session_timestamps.items()))
+            delay = ts + self.timeout_seconds - time.monotonic()
+            if delay > 0:
+                # Re-read the front afterwards: the session may have been touched meanwhile
+                await asyncio.sleep(delay)
+                continue
+            self.session_timestamps.popitem(last=False)
+            server_name = key.split(":")[0]
+            server_instance = user_server_instances.pop(key, None)
+            if key in user_session_transports:
+                del user_session_transports[key]
+                _server_active[server_name].dec()
+                logger.info(f"Cleaned up idle session: {key}")
+            if server_instance is not None:
+                await _close_session(server_name, server_instance)
 
 
 class JWTMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request, call_next):
         # Skip authentication for metrics, root, health check, and token endpoints
-        if request.url.path in ["/metrics", "/", "/health_check", "/token"]:
+        if request.url.path in _SKIP_PATHS:
             return await call_next(request)
 
         # Check for Authorization header
         auth_header = request.headers.get("Authorization")
         if not auth_header or not auth_header.startswith("Bearer "):
-            return JSONResponse(
+            return ORJSONResponse(
                 {"error": "Missing or invalid Authorization header"}, status_code=401
             )
 
         # Extract and verify JWT token
         token = auth_header[len("Bearer ") :]
         try:
-            payload = jwt_utils.verify_jwt_token(token)
+            key = hashlib.blake2b(token.encode("ascii"), digest_size=16).digest()
+            cached = _token_cache.get(key)
+            if cached is not None and cached[1] > time.time():
+                payload = cached[0]
+            else:
+                payload = jwt_utils.verify_jwt_token(token)
+                _token_cache[key] = (payload, payload.get("exp", float("inf")))
+            request.state.jwt_payload = payload
             request.state.user_id = payload["user_id"]
             request.state.conn_id = None
         except ValueError as e:
             logger.error(f"JWT verification failed: {e}")
-            return JSONResponse({"error": str(e)}, status_code=401)
+            return ORJSONResponse({"error": str(e)}, status_code=401)
 
         return await call_next(request)
 
 
+def get_jwt_payload(request: Request) -> dict:
+    """Return the JWT payload JWTMiddleware verified for this request.
+
+    The middleware is the single verification point; downstream code should read the
+    payload from here rather than calling jwt_utils.verify_jwt_token again.
+    """
+    return request.state.jwt_payload
+
+
 def discover_servers():
-    """Discover and load all servers from the servers directory"""
+    """Discover the servers in the servers directory (modules are imported at app startup)"""
     servers_dir = Path(__file__).parent.absolute()
     logger.info(f"Looking for servers in {servers_dir}")
 
@@ -140,33 +190,50 @@ def discover_servers():
             server_file = item / "main.py"
 
             if server_file.exists():
-                try:
-                    spec = importlib.util.spec_from_file_location(
-                        f"{server_name}.server", server_file
-                    )
-                    server_module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(server_module)
-
-                    if hasattr(server_module, "server") and hasattr(
-                        server_module, "get_initialization_options"
-                    ):
-                        server = server_module.server
-                        get_init_options = server_module.get_initialization_options
-                        servers[server_name] = {
-                            "server": server,
-                            "get_initialization_options": get_init_options,
-                        }
-                        logger.info(f"Loaded server: {server_name}")
-                    else:
-                        logger.warning(
-                            f"Server {server_name} does not have required server or get_initialization_options"
-                        )
-                except Exception as e:
-                    logger.error(f"Failed to load server {server_name}: {e}")
+                servers[server_name] = {"module_path": str(server_file)}
+                _server_active[server_name] = active_connections.labels(server=server_name)
 
     logger.info(f"Discovered {len(servers)} servers")
 
 
+def _load_server(server_name):
+    """Import a discovered server module and cache its server factory and init options"""
+    server_info = servers[server_name]
+    spec = importlib.util.spec_from_file_location(
+        f"{server_name}.server", server_info["module_path"]
+    )
+    server_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(server_module)
+
+    if not (
+        hasattr(server_module, "server")
+        and hasattr(server_module, "get_initialization_options")
+    ):
+        raise RuntimeError(
+            f"Server {server_name} does not have required server or get_initialization_options"
+        )
+    server_info["get_initialization_options"] = server_module.get_initialization_options
+    server_info["server"] = server_module.server
+    # Optional teardown hook for per-session resources
+    server_info["close_session"] = getattr(server_module, "close_session", None)
+    logger.info(f"Loaded server: {server_name}")
+
+
+def load_servers(app):
+    """Import every discovered server module once, dropping (and unrouting) the ones that fail"""
+    for server_name in list(servers):
+        try:
+            _load_server(server_name)
+        except Exception as e:
+            logger.error(f"Failed to load server {server_name}: {e}")
+            del servers[server_name]
+            _server_active.pop(server_name, None)
+            mount = _server_mounts.pop(server_name, None)
+            if mount is not None:
+                app.router.routes.remove(mount)
+    logger.info(f"Loaded {len(servers)} servers")
+
+
 def create_metrics_app():
     """Create a separate Starlette app just for metrics"""
 
@@ -179,6 +246,109 @@ def create_metrics_app():
     return app
 
 
+async def _close_session(server_name, server_instance):
+    """Let the server release resources held by a session instance (e.g. a pinned DB connection)"""
+    close_session = servers[server_name].get("close_session")
+    if close_session is None:
+        return
+    try:
+        await close_session(server_instance)
+    except Exception as e:
+        logger.error(f"Failed to close session resources for {server_name}: {e}")
+
+
+async def _handle_sse(server_name, request):
+    """Handle SSE connection requests for a specific server and session"""
+    server_info = servers[server_name]
+    server_factory = server_info["server"]
+    get_init_options = server_info["get_initialization_options"]
+
+    session_key_encoded = request.path_params["session_key"]
+    session_key = f"{server_name}:{session_key_encoded}"
+    request.scope["session_key"] = session_key
+
+    # Use user_id from JWT payload, conn_id from path if needed
+    user_id = request.state.user_id
+    # Parse conn_id from session_key if needed (e.g., user123:hash1)
+    conn_id = (
+        session_key_encoded.split(":")[-1]
+        if ":" in session_key_encoded
+        else None
+    )
+
+    if session_key not in user_server_instances:
+        server_instance = server_factory(user_id, conn_id)
+        user_server_instances[session_key] = server_instance
+    else:
+        server_instance = user_server_instances[session_key]
+
+    # Options only depend on the instance, so a reconnecting session reuses them
+    init_options = getattr(server_instance, "_cached_init_options", None)
+    if init_options is None:
+        init_options = get_init_options(server_instance)
+        server_instance._cached_init_options = init_options
+
+    # SseServerTransport routes POSTed messages by the session_id it hands each connection,
+    # so reconnects and parallel streams of a session share the session's transport
+    sse_transport = user_session_transports.get(session_key)
+    if sse_transport is None:
+        sse_transport = SseServerTransport(f"/{server_name}/{session_key_encoded}/messages/")
+        user_session_transports[session_key] = sse_transport
+        _server_active[server_name].inc()
+    user_session_streams[session_key] = user_session_streams.get(session_key, 0) + 1
+
+    try:
+        # Always increment total connections counter
+        # connection_total.labels(server=server_name).inc()
+
+        # Newer SseServerTransport versions prefix root_path to the message endpoint, and the
+        # per-server Mount sets it to "/{server_name}", which the endpoint already contains
+        async with sse_transport.connect_sse(
+            {**request.scope, "root_path": ""}, request.receive, request._send
+        ) as streams:
+            logger.info(
+                f"SSE connection established for {server_name} session: {user_id}"
+            )
+            await server_instance.run(
+                streams[0],
+                streams[1],
+                init_options,
+            )
+    finally:
+        remaining = user_session_streams.get(session_key, 1) - 1
+        if remaining > 0:
+            # Other streams of this session are still open on the same transport
+            user_session_streams[session_key] = remaining
+        else:
+            user_session_streams.pop(session_key, None)
+            # The idle cleanup may already have dropped (or a new stream replaced) the transport
+            if user_session_transports.get(session_key) is sse_transport:
+                del user_session_transports[session_key]
+                # Decrement active connections metric
+                _server_active[server_name].dec()
+                logger.info(
+                    f"Closed SSE connection for {server_name} session: {user_id}"
+                )
+            # The instance is kept for reconnects, but nothing may stay pinned without a stream
+            await _close_session(server_name, server_instance)
+
+
+async def _handle_message(server_name, request):
+    """Handle messages sent to a specific user session"""
+    session_key_encoded = request.path_params["session_key"]
+    session_key = f"{server_name}:{session_key_encoded}"
+
+    if session_key not in user_session_transports:
+        return Response(
+            f"Session not found or expired",
+            status_code=404,
+        )
+
+    request.scope["session_key"] = session_key
+    transport = user_session_transports[session_key]
+    return transport.handle_post_message
+
+
 def create_starlette_app():
     """Create a Starlette app with multiple SSE transports for different servers"""
     discover_servers()
@@ -191,116 +361,43 @@ def create_starlette_app():
             user_id = body.get("user_id")
 
             if not user_id:
-                return JSONResponse({"error": "user_id is required"}, status_code=400)
+                return ORJSONResponse({"error": "user_id is required"}, status_code=400)
 
             jwt_token = jwt_utils.generate_jwt_token(user_id)
             logger.info(f"Issued JWT token for user {user_id} ")
-            return JSONResponse({"success": True, "jwt_token": jwt_token})
+            return ORJSONResponse({"success": True, "jwt_token": jwt_token})
         except ValueError as e:
             logger.error(f"Failed to issue JWT token: {e}")
-            return JSONResponse({"error": str(e)}, status_code=400)
+            return ORJSONResponse({"error": str(e)}, status_code=400)
         except Exception as e:
             logger.error(f"Failed to issue JWT token: {e}")
-            return JSONResponse({"error": str(e)}, status_code=500)
+            return ORJSONResponse({"error": str(e)}, status_code=500)
 
     routes.append(Route("/token", endpoint=token_endpoint, methods=["POST"]))
 
-    for server_name, server_info in servers.items():
-
-        def create_handler(server_name, server_factory, get_init_options):
-            async def handle_sse(request):
-                """Handle SSE connection requests for a specific server and session"""
-                session_key_encoded = request.path_params["session_key"]
-                session_key = f"{server_name}:{session_key_encoded}"
-
-                # Use user_id from JWT payload, conn_id from path if needed
-                user_id = request.state.user_id
-                # Parse conn_id from session_key if needed (e.g., user123:hash1)
-                conn_id = (
-                    session_key_encoded.split(":")[-1]
-                    if ":" in session_key_encoded
-                    else None
-                )
-
-                sse_transport = SseServerTransport(
-                    f"/{server_name}/{session_key_encoded}/messages/"
-                )
-
-                user_session_transports[session_key] = sse_transport
-
-                if session_key not in user_server_instances:
-                    server_instance = server_factory(user_id, conn_id)
-                    user_server_instances[session_key] = server_instance
-                    active_connections.labels(server=server_name).inc()
-                else:
-                    server_instance = user_server_instances[session_key]
-
-                init_options = get_init_options(server_instance)
-
-                try:
-                    # Always increment total connections counter
-                    # connection_total.labels(server=server_name).inc()
-
-                    async with sse_transport.connect_sse(
-                        request.scope, request.receive, request._send
-                    ) as streams:
-                        logger.info(
-                            f"SSE connection established for {server_name} session: {user_id}"
-                        )
-                        await server_instance.run(
-                            streams[0],
-                            streams[1],
-                            init_options,
-                        )
-                finally:
-                    if session_key in user_session_transports:
-                        del user_session_transports[session_key]
-                        # Decrement active connections metric
-                        active_connections.labels(server=server_name).dec()
-                        logger.info(
-                            f"Closed SSE connection for {server_name} session: {user_id}"
-                        )
-
-            return handle_sse
-
-        handler = create_handler(
-            server_name,
-            server_info["server"],
-            server_info["get_initialization_options"],
-        )
-        routes.append(Route(f"/{server_name}/{{session_key}}", endpoint=handler))
-
-        def create_message_handler(server_name):
-            async def handle_message(request):
-                """Handle messages sent to a specific user session"""
-                session_key_encoded = request.path_params["session_key"]
-                session_key = f"{server_name}:{session_key_encoded}"
-
-                if session_key not in user_session_transports:
-                    return Response(
-                        f"Session not found or expired",
-                        status_code=404,
-                    )
-
-                transport = user_session_transports[session_key]
-                return transport.handle_post_message
-
-            return handle_message
-
-        message_handler = create_message_handler(server_name)
-        routes.append(
-            Route(
-                f"/{server_name}/{{session_key}}/messages/",
-                endpoint=message_handler,
-                methods=["POST"],
-            )
+    for server_name in servers:
+        handler = functools.partial(_handle_sse, server_name)
+        message_handler = functools.partial(_handle_message, server_name)
+        # One Mount per server, so path matching only descends into the requested server's routes
+        mount = Mount(
+            f"/{server_name}",
+            routes=[
+                Route("/{session_key}", endpoint=handler),
+                Route(
+                    "/{session_key}/messages/",
+                    endpoint=message_handler,
+                    methods=["POST"],
+                ),
+            ],
         )
+        _server_mounts[server_name] = mount
+        routes.append(mount)
 
         logger.info(f"Added user-specific routes for server: {server_name}")
 
     async def root_handler(request):
         """Root endpoint that returns a simple 200 OK response"""
-        return JSONResponse(
+        return ORJSONResponse(
             {
                 "status": "ok",
                 "message": "guMCP server running",
@@ -312,7 +409,7 @@ def create_starlette_app():
 
     async def health_check(request):
         """Health check endpoint"""
-        return JSONResponse({"status": "ok", "servers": list(servers.keys())})
+        return ORJSONResponse({"status": "ok", "servers": list(servers.keys())})
 
     routes.append(Route("/health_check", endpoint=health_check))
 
@@ -323,17 +420,32 @@ def create_starlette_app():
     )  # Add session timeout middleware
     app.add_middleware(JWTMiddleware)  # Add JWT middleware
 
+    def start_session_cleanup():
+        SessionTimeoutMiddleware.instance.ensure_started()
+
+    # Server modules are imported once here, on the event loop thread before any request is
+    # served, so their import-time setup (log listeners, atexit hooks) runs in one known place
+    app.add_event_handler("startup", functools.partial(load_servers, app))
+    app.add_event_handler("startup", start_session_cleanup)
+
     return app
 
 
-def run_metrics_server(host, port):
-    """Run a separate metrics server on the specified port"""
-    metrics_app = create_metrics_app()
-    logger.info(f"Starting metrics server on {host}:{port}")
-    uvicorn.run(metrics_app, host=host, port=port)
+async def serve(app, host, port):
+    """Run the Starlette app and the metrics app as two uvicorn servers on one event loop"""
+    uvicorn_servers = [
+        uvicorn.Server(uvicorn.Config(app, host=host, port=port)),
+        uvicorn.Server(uvicorn.Config(create_metrics_app(), host=host, port=METRICS_PORT)),
+    ]
+    tasks = [asyncio.create_task(server.serve()) for server in uvicorn_servers]
+    # Only one server ends up owning the signal handlers, so when either stops, stop both
+    await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    for server in uvicorn_servers:
+        server.should_exit = True
+    await asyncio.gather(*tasks)
 
 
-def main():
+def main(argv=None):
     """Main entry point for the Starlette server"""
     parser = argparse.ArgumentParser(description="guMCP Server")
     parser.add_argument("--host", default="0.0.0.0", help="Host for Starlette server")
@@ -341,17 +453,21 @@ def main():
         "--port", type=int, default=8000, help="Port for Starlette server"
     )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
-    metrics_thread = threading.Thread(
-        target=run_metrics_server, args=(args.host, METRICS_PORT), daemon=True
-    )
-    metrics_thread.start()
-    logger.info(f"Starting Metrics server on http://{args.host}:{METRICS_PORT}/metrics")
+    # asyncio.run below creates the loop itself, so uvicorn's loop="auto" never applies;
+    # install uvloop here too in case remote.py is started directly rather than via main.py
+    try:
+        import uvloop
+
+        uvloop.install()
+    except ImportError:
+        pass
 
     app = create_starlette_app()
+    logger.info(f"Starting Metrics server on http://{args.host}:{METRICS_PORT}/metrics")
     logger.info(f"Starting Starlette server on {args.host}:{args.port}")
-    uvicorn.run(app, host=args.host, port=args.port)
+    asyncio.run(serve(app, args.host, args.port))
 
 
 if __name__ == "__main__":
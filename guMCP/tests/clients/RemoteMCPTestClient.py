@@ -3,7 +3,7 @@ import traceback
 import json
 from typing import Optional, List, Dict, Any
 from contextlib import AsyncExitStack
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 from mcp import ClientSession
 from mcp.client.sse import sse_client
@@ -21,8 +21,8 @@ class RemoteMCPTestClient:
         api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OpenAI API key not provided")
-        # 동기 OpenAI 클라이언트 초기화
-        self.openai = OpenAI(api_key=api_key, base_url=base_url or "https://api.openai.com/v1")
+        # 비동기 OpenAI 클라이언트 초기화 (응답 대기 중에도 이벤트 루프를 막지 않음)
+        self.openai = AsyncOpenAI(api_key=api_key, base_url=base_url or "https://api.openai.com/v1")
 
     async def __aenter__(self):
         return self
@@ -92,8 +92,8 @@ class RemoteMCPTestClient:
             } for tool in response.tools
         ]
 
-        # GPT-4o 초기 호출 (동기 API 사용)
-        response = self.openai.chat.completions.create(
+        # GPT-4o 초기 호출
+        response = await self.openai.chat.completions.create(
             model="gpt-4o",
             messages=messages,
             tools=available_tools,
@@ -106,50 +106,54 @@ class RemoteMCPTestClient:
             final_text.append(choice.message.content)
 
         if choice.message.tool_calls:
-            for tool_call in choice.message.tool_calls:
-                tool_name = tool_call.function.name
-                tool_args = json.loads(tool_call.function.arguments)
-
-                # 툴 호출 실행
-                result = await self.session.call_tool(tool_name, tool_args)
-                final_text.append(f"[Called tool {tool_name} with args {tool_args}]")
-
-                # assistant 역할로 tool_call 명시
-                messages.append({
-                    "role": "assistant",
-                    "tool_calls": [
-                        {
-                            "id": tool_call.id,
-                            "type": "function",
-                            "function": {
-                                "name": tool_name,
-                                "arguments": json.dumps(tool_args)
-                            }
+            tool_calls = choice.message.tool_calls
+            tool_args_list = [json.loads(tool_call.function.arguments) for tool_call in tool_calls]
+
+            # 툴 호출을 동시에 실행
+            results = await asyncio.gather(*(
+                self.session.call_tool(tool_call.function.name, tool_args)
+                for tool_call, tool_args in zip(tool_calls, tool_args_list)
+            ))
+
+            # assistant 역할로 모든 tool_call을 한 메시지에 명시
+            messages.append({
+                "role": "assistant",
+                "tool_calls": [
+                    {
+                        "id": tool_call.id,
+                        "type": "function",
+                        "function": {
+                            "name": tool_call.function.name,
+                            "arguments": json.dumps(tool_args)
                         }
-                    ]
-                })
-
-                # tool 역할로 응답 추가
+                    }
+                    for tool_call, tool_args in zip(tool_calls, tool_args_list)
+                ]
+            })
+
+            # tool 역할로 각 응답 추가
+            for tool_call, tool_args, result in zip(tool_calls, tool_args_list, results):
+                final_text.append(f"[Called tool {tool_call.function.name} with args {tool_args}]")
                 messages.append({
                     "role": "tool",
                     "tool_call_id": tool_call.id,
                     "content": "\n".join(content.text for content in result.content)
                 })
-                
-                # 후속 GPT-4o 호출
-                try:
-                    response = self.openai.chat.completions.create(
-                        model="gpt-4o",
-                        messages=messages,
-                        tools=available_tools,
-                        tool_choice="auto"
-                    )
-                except Exception as e:
-                    print("후속 GPT-4o 호출 에러:", e)
-                    raise
-                followup_choice = response.choices[0]
-                if followup_choice.message.content:
-                    final_text.append(followup_choice.message.content)
+
+            # 모든 툴 결과를 받은 뒤 후속 GPT-4o 호출은 한 번만
+            try:
+                response = await self.openai.chat.completions.create(
+                    model="gpt-4o",
+                    messages=messages,
+                    tools=available_tools,
+                    tool_choice="auto"
+                )
+            except Exception as e:
+                print("후속 GPT-4o 호출 에러:", e)
+                raise
+            followup_choice = response.choices[0]
+            if followup_choice.message.content:
+                final_text.append(followup_choice.message.content)
 
         return "\n".join(final_text)
 
@@ -169,40 +173,12 @@ class RemoteMCPTestClient:
                 traceback.print_exc()
 
     async def cleanup(self):
+        # ClientSession과 SSE 스트림은 exit stack이 소유하므로 등록의 역순으로 함께 정리
+        self.session = None
         try:
-            if self.session:
-                # ClientSession 정리
-                try:
-                    # 명시적 종료 메서드 확인
-                    if hasattr(self.session, "close"):
-                        await self.session.close()
-                    elif hasattr(self.session, "shutdown"):
-                        await self.session.shutdown()
-                    elif hasattr(self.session, "disconnect"):
-                        await self.session.disconnect()
-                except Exception as e:
-                    print(f"Error closing session: {e}")
-                finally:
-                    self.session = None
-
-            # AsyncExitStack 정리
-            try:
-                # _exit_callbacks를 안전하게 처리
-                while self.exit_stack._exit_callbacks:
-                    cm = self.exit_stack._exit_callbacks.pop()
-                    try:
-                        # cm이 callable인지 확인
-                        if callable(cm):
-                            await cm(None, None, None)
-                        # else:
-                            # print(f"Skipping non-callable context manager: {cm}")
-                    except Exception as e:
-                        print(f"Error closing context manager: {e}")
-            except Exception as e:
-                print(f"Error during exit stack cleanup: {e}")
-        finally:
-            pass
-            # print(f"Cleanup end in task: {id(asyncio.current_task())}")
+            await self.exit_stack.aclose()
+        except Exception as e:
+            print(f"Error during exit stack cleanup: {e}")
 
     async def llm_as_a_judge(self, requirements: str, response: str) -> dict:
         """GPT-4o를 사용해 응답이 요구사항을 충족하는지 평가"""
@@ -223,7 +199,7 @@ class RemoteMCPTestClient:
         """
         messages = [{"role": "user", "content": evaluation_prompt.strip()}]
 
-        gpt_response = self.openai.chat.completions.create(
+        gpt_response = await self.openai.chat.completions.create(
             model="gpt-4o",
             messages=messages,
             max_tokens=100
@@ -251,7 +227,7 @@ class RemoteMCPTestClient:
         """
         messages = [{"role": "user", "content": extraction_prompt.strip()}]
 
-        gpt_response = self.openai.chat.completions.create(
+        gpt_response = await self.openai.chat.completions.create(
             model="gpt-4o",
             messages=messages,
             max_tokens=300
@@ -269,12 +245,9 @@ async def main():
     parser.add_argument("--base-url", default="https://api.openai.com/v1")
     args = parser.parse_args()
 
-    # 동기 HTTP 클라이언트로 토큰 발급
-    with httpx.Client() as http_client:
-        response = http_client.post(
-            "http://localhost:8000/token",
-            json={"user_id": "test_user"}
-        )
+    # 비동기 HTTP 클라이언트로 토큰 발급
+    async with httpx.AsyncClient(base_url="http://localhost:8000") as http_client:
+        response = await http_client.post("/token", json={"user_id": "test_user"})
         response.raise_for_status()
         token = response.json()["jwt_token"]
 
@@ -29,12 +29,25 @@ def pytest_collection_modifyitems(items: List[pytest.Item]):
     for item in items:
         if (
             item.get_closest_marker("asyncio") is None
-            and "async def" in item.function.__code__.co_code
+            and asyncio.iscoroutinefunction(item.function)
         ):
             item.add_marker(pytest.mark.asyncio)
 
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def http_client():
+    # 세션 전체에서 하나의 HTTP 연결을 재사용
+    async with httpx.AsyncClient(base_url="http://localhost:8000") as http_client:
+        yield http_client
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def token(http_client):
+    # 토큰은 user_id로만 발급되므로 세션당 한 번만 발급
+    response = await http_client.post("/token", json={"user_id": "test_user"})
+    response.raise_for_status()
+    return response.json()["jwt_token"]
+
 @pytest_asyncio.fixture(scope="function")
-async def client(request):
+async def client(request, token):
     test_path = request.node.fspath.strpath
     server_name = os.path.basename(os.path.dirname(test_path))
     endpoint = (
@@ -42,15 +55,6 @@ async def client(request):
         or f"http://localhost:8000/{server_name}/test_user:test_key"
     )
 
-    # 동기 HTTP 클라이언트로 토큰 발급
-    with httpx.Client() as http_client:
-        response = http_client.post(
-            f"http://localhost:8000/token",
-            json={"user_id": "test_user", "service_name": server_name}
-        )
-        response.raise_for_status()
-        token = response.json()["jwt_token"]
-
     client = RemoteMCPTestClient(token=token)
     print(f"Client fixture setup in task: {asyncio.current_task()}")
 
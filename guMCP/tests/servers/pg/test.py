@@ -1,6 +1,14 @@
+import re
 import pytest
 import json
-from tests.utils.test_tools import get_test_id, run_tool_test
+from tests.utils.test_tools import (
+    EXTRACTOR_FLAGS,
+    format_keys,
+    get_test_id,
+    make_prompt_prefix,
+    make_test_id,
+    run_tool_test,
+)
 
 # TOOL_TESTS = [
 #     {
@@ -122,10 +130,7 @@ TOOL_TESTS = [
         "description": "list all schemas with USAGE privilege",
         "depends_on": ["success"],
         "setup": lambda ctx: {"schema": None} if not ctx.get("success") or not json.loads(ctx["success"]) else {
-            "schema": next(
-                (item["schema_name"] for item in json.loads(ctx["schemas_json"]) if item["schema_name"] == "public"),
-                None
-            )
+            "schema": "public" if "public" in {item["schema_name"] for item in ctx.get("schemas") or ()} else None
         }
     },
     {
@@ -139,33 +144,30 @@ TOOL_TESTS = [
         "description": "list tables in selected schema",
         "depends_on": ["schema"],
         "setup": lambda ctx: {"table": None} if not ctx.get("success") or not json.loads(ctx["success"]) else {
-            "table": next(
-                (item["table_name"] for item in json.loads(ctx["tables_json"]) if item["table_name"] == "customers"),
-                None
-            )
+            "table": "customers" if "customers" in {item["table_name"] for item in ctx.get("tables") or ()} else None
         }
     },
     {
-        "name": "pg_list_table_metadata",
+        "name": "pg_catalog_bulk",
         "args_template": 'with schema={schema}, table_name={table}',
         "expected_keywords": ["success", "data"],
-        "description": "Get metadata (name, type, comment) of a specific table in a given schema in the PostgreSQL database, if the current user has SELECT privilege",
+        "description": "Get schemas, tables, table metadata, column metadata and estimated row count of a specific table in a given schema in the PostgreSQL database in a single call",
         "depends_on": ["schema", "table"],
     },
     {
-        "name": "pg_list_columns_metadata",
+        "name": "pg_count_table_rows",
         "args_template": 'with schema={schema}, table_name={table}',
-        "expected_keywords": ["success", "data"],
-        "description": "Get metadata for all columns of a specific table in a given schema in the PostgreSQL database",
+        "expected_keywords": ["success", "row_count", "estimated"],
+        "description": "Get the estimated number of rows (exact=false, the default) in a specific table within a given schema in the PostgreSQL database",
         "depends_on": ["schema", "table"],
     },
     {
         "name": "pg_count_table_rows",
-        "args_template": 'with schema={schema}, table_name={table}',
-        "expected_keywords": ["success", "data"],
-        "description": "Get the number of rows in a specific table within a given schema in the PostgreSQL database",
+        "args_template": 'with schema={schema}, table_name={table}, exact=true',
+        "expected_keywords": ["success", "row_count", "estimated"],
+        "description": "Get the exact number of rows (exact=true, COUNT(*)) in a specific table within a given schema in the PostgreSQL database",
         "depends_on": ["schema", "table"],
-    },    
+    },
     {
         "name": "pg_sample_table_rows",
         "args_template": 'with schema={schema}, table_name={table}',
@@ -189,6 +191,17 @@ TOOL_TESTS = [
     }
 ]
 
+# regex_extractors 컴파일, test ID, args_template 필드와 프롬프트 앞부분 계산은 import 시 한 번만
+for _test in TOOL_TESTS:
+    _test["_test_id"] = make_test_id(_test)
+    _test["_fmt_keys"] = format_keys(_test.get("args_template", ""))
+    _test["_prompt_prefix"] = make_prompt_prefix(_test)
+    if "regex_extractors" in _test:
+        _test["regex_extractors"] = {
+            key: re.compile(pattern, EXTRACTOR_FLAGS)
+            for key, pattern in _test["regex_extractors"].items()
+        }
+
 # Shared context dictionary at module level
 # SHARED_CONTEXT = {"success":False,"schemas_json":None,"tables_json":None,"data":None,"table":None,"schema":None}
 SHARED_CONTEXT = {}
@@ -30,21 +30,6 @@ if __name__ == "__main__":
         print(f"Error: No tests.py found for server '{server_name}'")
         sys.exit(1)
 
-    # Clean up any existing .pyc files and __pycache__ directories
-    for root, dirs, files in os.walk(os.path.dirname(tests_path)):
-        if "__pycache__" in dirs:
-            import shutil
-            try:
-                shutil.rmtree(os.path.join(root, "__pycache__"))
-            except Exception as e:
-                print(f"Warning: Failed to remove __pycache__: {e}")
-        for file in files:
-            if file.endswith(".pyc"):
-                try:
-                    os.remove(os.path.join(root, file))
-                except Exception as e:
-                    print(f"Warning: Failed to remove {file}: {e}")
-
     # Construct pytest arguments
     pytest_args = [
         "-v",  # verbose output
@@ -1,24 +1,55 @@
 import pytest
 import re
+import string
+import orjson
 
+# Flags for the regex_extractors patterns; server test modules may compile them once with these
+EXTRACTOR_FLAGS = re.DOTALL | re.IGNORECASE
 
-def get_test_id(test_config):
+URI_RE = re.compile(r"^([a-zA-Z0-9_-]+)://([a-zA-Z0-9_-]+)/(.+)$")
+
+# JSON object keys ("key":) in the lowercased response
+JSON_KEY_RE = re.compile(r'"([a-z_]+)"\s*:')
+
+
+def format_keys(template):
+    """Names of the fields a str.format template refers to, e.g. ("schema", "table")"""
+    return tuple(
+        name for _, name, _, _ in string.Formatter().parse(template) if name
+    )
+
+
+def make_test_id(test_config):
     """Generate a unique test ID based on the test name and description hash"""
     return f"{test_config['name']}_{hash(test_config['description']) % 1000}"
 
 
+def get_test_id(test_config):
+    """Test ID precomputed by the server test module (see make_test_id)"""
+    return test_config.get("_test_id") or make_test_id(test_config)
+
+
 def validate_resource_uri(uri):
     """
     Validates that a resource URI follows the expected format: {server_id}://{resource_type}/{resource_id}
     Returns a tuple of (is_valid, components) where components is (server_id, resource_type, resource_id)
     """
-    pattern = r"^([a-zA-Z0-9_-]+)://([a-zA-Z0-9_-]+)/(.+)$"
-    match = re.match(pattern, uri)
+    match = URI_RE.match(uri)
     if not match:
         return False, None
     return True, match.groups()
 
 
+def make_prompt_prefix(test_config):
+    """Constant head of a test's prompt; only the tool/description/args tail varies per call"""
+    keywords_str = ", ".join(test_config["expected_keywords"])
+    return (
+        "Not interested in your recommendations or what you think is best practice, just use what's given. "
+        "Only pass required arguments to the tool and in case I haven't provided a required argument, you can try to pass your own that makes sense. "
+        f"Only return the value with following keywords: {keywords_str} if successful or error with keyword 'error_message'. ensure to keep the keywords name exact same "
+    )
+
+
 @pytest.mark.asyncio
 async def run_tool_test(client, context, test_config):
     """
@@ -56,27 +87,31 @@ async def run_tool_test(client, context, test_config):
     if "args" in test_config:
         args = test_config["args"]
     elif "args_template" in test_config:
-        try:
-            args = test_config["args_template"].format(**context)
-        except KeyError as e:
-            pytest.skip(f"Missing context value: {e}")
-            return
-        except Exception as e:
-            pytest.skip(f"Error formatting args: {e}")
-            return
+        template = test_config["args_template"]
+        fmt_keys = test_config.get("_fmt_keys")
+        if fmt_keys is None:
+            fmt_keys = format_keys(template)
+        if not fmt_keys and "{" not in template:
+            args = template
+        else:
+            missing_values = [key for key in fmt_keys if key not in context]
+            if missing_values:
+                pytest.skip(f"Missing context value: {', '.join(missing_values)}")
+                return
+            try:
+                args = template.format(**context)
+            except Exception as e:
+                pytest.skip(f"Error formatting args: {e}")
+                return
     else:
         args = ""
 
-    keywords_str = ", ".join(expected_keywords)
-    prompt = (
-        "Not interested in your recommendations or what you think is best practice, just use what's given. "
-        "Only pass required arguments to the tool and in case I haven't provided a required argument, you can try to pass your own that makes sense. "
-        f"Only return the value with following keywords: {keywords_str} if successful or error with keyword 'error_message'. ensure to keep the keywords name exact same "
-        f"Use the {tool_name} tool to {description} {args}. "
-    ).format(tool_name=tool_name, description=description, args=args, keywords_str=keywords_str)
+    prompt_prefix = test_config.get("_prompt_prefix") or make_prompt_prefix(test_config)
+    prompt = prompt_prefix + f"Use the {tool_name} tool to {description} {args}. "
 
     response = await client.process_query(prompt)
     print(f"response: {response}")
+    response_lc = response.lower()
     # if (
     #     "empty" in response.lower()
     #     or "[]" in response
@@ -91,24 +126,39 @@ async def run_tool_test(client, context, test_config):
     #     pytest.skip(f"Empty result from API for {tool_name}")
     #     return
 
-    if "error_message" in response.lower() and "error_message" not in expected_keywords:
+    if "error_message" in response_lc and "error_message" not in expected_keywords:
         pytest.fail(f"API error for {tool_name}: {response}")
         return
 
     if "regex_extractors" in test_config:
         for key, pattern in test_config["regex_extractors"].items():
-            match = re.search(pattern, response, re.DOTALL | re.IGNORECASE)
+            if isinstance(pattern, str):
+                # Not precompiled by the server test module; re caches the compiled pattern
+                pattern = re.compile(pattern, EXTRACTOR_FLAGS)
+            match = pattern.search(response)
             if match and len(match.groups()) > 0:
                 context[key] = match.group(1).strip()
+                # "*_json" 값은 여기서 한 번만 파싱해 접미사 없는 키로 저장 (예: schemas_json -> schemas)
+                # 잘리거나 형식이 어긋난 LLM 응답이면 None으로 두고 setup에서 처리
+                if key.endswith("_json"):
+                    try:
+                        context[key[:-5]] = orjson.loads(context[key])
+                    except orjson.JSONDecodeError:
+                        context[key[:-5]] = None
 
     if "setup" in test_config and callable(test_config["setup"]):
         setup_result = test_config["setup"](context)
         if isinstance(setup_result, dict):
             context.update(setup_result)
-    missing_keywords = []
-    for keyword in expected_keywords:
-        if keyword != "error_message" and keyword.lower() not in response.lower():
-            missing_keywords.append(keyword)
+    # JSON 키는 한 번에 모아 set으로 확인하고, JSON이 아닌 응답은 부분 문자열 검사로 처리
+    found_keys = set(JSON_KEY_RE.findall(response_lc))
+    missing_keywords = [
+        keyword
+        for keyword in expected_keywords
+        if keyword != "error_message"
+        and keyword.lower() not in found_keys
+        and keyword.lower() not in response_lc
+    ]
 
     if missing_keywords:
         pytest.skip(f"Keywords not found: {', '.join(missing_keywords)}")
@@ -26,7 +26,8 @@ register_query_tools()
 
 from contextlib import asynccontextmanager
 from starlette.applications import Starlette
-from starlette.routing import Mount
+from starlette.responses import PlainTextResponse
+from starlette.routing import Mount, Route
 import uvicorn
 
 @asynccontextmanager
@@ -36,7 +37,19 @@ async def starlette_lifespan(app):
     logger.info("Starlette application shutting down, closing all database connections")
     await global_db.close()
 
+# 클라이언트 헬스 체크용 (SSE 엔드포인트와 달리 짧은 응답이라 keep-alive 연결을 재사용할 수 있음)
+async def health(request):
+    return PlainTextResponse("ok")
+
 if __name__ == "__main__":
+    # libuv 기반 이벤트 루프 사용 (설치되지 않았으면 기본 asyncio 루프)
+    try:
+        import uvloop
+
+        uvloop.install()
+    except ImportError:
+        pass
+
     logger.info("Starting MCP server with SSE transport")
-    app = Starlette(routes=[Mount('/', app=mcp.sse_app())])
+    app = Starlette(routes=[Route('/health', endpoint=health), Mount('/', app=mcp.sse_app())])
     uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
\ No newline at end of file
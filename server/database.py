@@ -1,20 +1,28 @@
-import json
+import orjson
 import asyncpg
 import asyncio
 from pathlib import Path
+from types import MappingProxyType
 from contextlib import asynccontextmanager
 from mcp.server.fastmcp.utilities.logging import get_logger
 from hashlib import sha1
 import aiofiles
 
+try:
+    from watchfiles import awatch
+except ImportError:  # 설치되지 않았으면 60초 폴링으로 동작
+    awatch = None
+
 logger = get_logger("pg-mcp.database")
 
 class Database:
     def __init__(self, config_path="/etc/config/pg_connections.json"):
         self._pools = {}
-        self._connection_map = {}  # { conn_id (sha1) : connection_string }
+        self._init_locks: dict[str, asyncio.Lock] = {}  # { conn_id: Lock } 풀 생성 직렬화
+        self._connection_map = MappingProxyType({})  # { conn_id (sha1) : connection_string }, 읽기 전용 스냅샷
         self._config_path = Path(config_path)
         self._last_config_hash = None
+        self._last_stat = None  # (st_mtime_ns, st_size) of the last config file read
         self._refresh_task = None
 
     async def start_background_refresh(self):
@@ -22,54 +30,88 @@ class Database:
             self._refresh_task = asyncio.create_task(self._refresh_loop())
 
     async def _refresh_loop(self):
-        while True:
+        await self._safe_reload()
+        if awatch is not None:
             try:
-                await self._reload_config_if_changed()
+                # ConfigMap 갱신은 심볼릭 링크 교체로 일어나므로 파일이 아닌 디렉터리를 감시
+                async for _changes in awatch(self._config_path.parent):
+                    await self._safe_reload()
             except Exception as e:
-                logger.error(f"Error during config refresh: {e}")
+                logger.warning(f"Config watcher unavailable, falling back to polling: {e}")
+        else:
+            logger.warning("watchfiles is not installed, polling the config every 60 seconds")
+        while True:
             await asyncio.sleep(60)
+            await self._safe_reload()
 
-    def _hash_config(self, content):
-        return sha1(json.dumps(content, sort_keys=True).encode()).hexdigest()
+    async def _safe_reload(self):
+        try:
+            await self._reload_config_if_changed()
+        except Exception as e:
+            logger.error(f"Error during config refresh: {e}")
 
     async def _reload_config_if_changed(self):
-        if not self._config_path.exists():
+        try:
+            st = self._config_path.stat()
+        except FileNotFoundError:
             logger.warning(f"Config path {self._config_path} not found.")
             return
 
+        # 파일이 그대로면 읽기/파싱/해시 모두 생략
+        stat_key = (st.st_mtime_ns, st.st_size)
+        if stat_key == self._last_stat:
+            return
+
         # 비동기적으로 파일을 읽음
-        async with aiofiles.open(self._config_path, mode='r') as f:
-            content = await f.read()
-            content = json.loads(content)
+        async with aiofiles.open(self._config_path, mode='rb') as f:
+            raw = await f.read()
 
-        current_hash = self._hash_config(content)
+        # 파싱 전에 원본 바이트를 해시해서 내용이 같으면 파싱도 생략
+        current_hash = sha1(raw).hexdigest()
         if current_hash == self._last_config_hash:
+            self._last_stat = stat_key
             return
 
+        content = orjson.loads(raw)
+        self._last_stat = stat_key
+
         logger.info("Detected config map change, updating connections")
         self._last_config_hash = current_hash
 
-        self._connection_map = content  # key = sha1, value = connection string
+        # 새 읽기 전용 스냅샷을 한 번에 교체하므로 읽는 쪽은 락 없이 일관된 맵을 봄
+        self._connection_map = MappingProxyType(dict(content))  # key = sha1, value = connection string
 
     def get_connection_string(self, conn_id):
-        if conn_id not in self._connection_map:
+        conn_str = self._connection_map.get(conn_id)
+        if conn_str is None:
             raise ValueError(f"Unknown connection ID: {conn_id}")
-        return self._connection_map[conn_id]
+        return conn_str
 
     async def initialize(self, conn_id):
         if not conn_id:
             raise ValueError("Connection ID is required")
 
-        if conn_id not in self._pools:
+        if conn_id in self._pools:
+            return self
+
+        # 같은 conn_id로 동시에 들어온 요청은 하나의 풀 생성을 기다림
+        lock = self._init_locks.setdefault(conn_id, asyncio.Lock())
+        async with lock:
+            if conn_id in self._pools:
+                return self
+
             conn_str = self.get_connection_string(conn_id)
 
             logger.info(f"Creating new database connection pool for connection ID {conn_id}")
             self._pools[conn_id] = await asyncpg.create_pool(
                 conn_str,
                 min_size=2,
-                max_size=4,
+                max_size=20,
+                max_inactive_connection_lifetime=300,
+                statement_cache_size=1024,
                 command_timeout=60.0,
-                server_settings={"default_transaction_read_only": "true"}
+                # JIT 컴파일은 짧은 조회에 지연만 추가하므로 끔
+                server_settings={"default_transaction_read_only": "true", "jit": "off"}
             )
         return self
 
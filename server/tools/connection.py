@@ -22,12 +22,12 @@ def register_connection_tools():
         db = mcp.state["db"]
 
         # Ensure the connection pool is initialized for the given connection ID
-        if conn_id not in db._pools:
-            try:
-                await db.initialize(conn_id)
-            except Exception as e:
-                logger.error(f"Failed to initialize pool for connection ID {conn_id}: {e}")
-                return {"success": False, "error": f"Failed to initialize connection pool: {str(e)}"}
+        # (initialize returns immediately when the pool already exists)
+        try:
+            await db.initialize(conn_id)
+        except Exception as e:
+            logger.error(f"Failed to initialize pool for connection ID {conn_id}: {e}")
+            return {"success": False, "error": f"Failed to initialize connection pool: {str(e)}"}
 
         # Check if the connection ID exists in the connection map
         if conn_id in db._connection_map:
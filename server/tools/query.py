@@ -1,10 +1,71 @@
 # server/tools/query.py
+import orjson
 from config import mcp
 from mcp.server.fastmcp import Context
 from mcp.server.fastmcp.utilities.logging import get_logger
 
 logger = get_logger("pg-mcp.tools.query")
 
+# 스키마 목록, 테이블 목록, 테이블/컬럼 메타데이터와 예상 행 수를 카탈로그에서 한 번에 조회
+# row_count는 pg_class.reltuples 추정치 (음수 = ANALYZE 전 -> NULL)
+_SQL_CATALOG_BULK = """
+    WITH t AS (
+        SELECT c.oid, c.relname, c.relkind, c.reltuples
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = $1
+        AND c.relkind IN ('r', 'p', 'v', 'f')
+        AND has_table_privilege(c.oid, 'SELECT')
+    )
+    SELECT
+        (SELECT COALESCE(jsonb_agg(nspname ORDER BY nspname), '[]'::jsonb)
+            FROM pg_namespace
+            WHERE has_schema_privilege(oid, 'USAGE')) AS schemas,
+        (SELECT COALESCE(jsonb_agg(relname ORDER BY relname), '[]'::jsonb)
+            FROM t) AS tables,
+        (SELECT jsonb_build_object(
+                'table_name', relname,
+                'table_type', CASE relkind WHEN 'v' THEN 'VIEW' WHEN 'f' THEN 'FOREIGN' ELSE 'BASE TABLE' END,
+                'table_comment', obj_description(oid, 'pg_class'))
+            FROM t
+            WHERE relname = $2) AS table_meta,
+        (SELECT COALESCE(
+                jsonb_agg(
+                    jsonb_build_object(
+                        'column_name', a.attname,
+                        'data_type', format_type(a.atttypid, a.atttypmod),
+                        'is_nullable', CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END,
+                        'column_default', pg_get_expr(d.adbin, d.adrelid),
+                        'column_comment', col_description(a.attrelid, a.attnum)
+                    ) ORDER BY a.attnum
+                ),
+                '[]'::jsonb
+            )
+            FROM t
+            JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum > 0 AND NOT a.attisdropped
+            LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+            WHERE t.relname = $2) AS columns,
+        (SELECT CASE WHEN reltuples < 0 THEN NULL ELSE reltuples::bigint END
+            FROM t
+            WHERE relname = $2) AS row_count;
+"""
+
+# 마지막 ANALYZE/VACUUM 기준 플래너 행 수 추정치. 추정치가 없으면 NULL (-> COUNT(*)):
+# reltuples < 0은 PG14+의 ANALYZE 전, relpages = 0은 빈 테이블 또는 PG13 이하의 ANALYZE 전
+# 행을 가진 relation(테이블, 파티션 테이블, 구체화 뷰, 외부 테이블)만 대상
+_SQL_ESTIMATE_ROWS = """
+    SELECT CASE WHEN c.reltuples < 0 OR c.relpages = 0 THEN NULL ELSE c.reltuples::bigint END
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = $1
+    AND c.relname = $2
+    AND c.relkind IN ('r', 'p', 'm', 'f');
+"""
+
+def _quote_ident(name: str) -> str:
+    # PostgreSQL identifier quoting: wrap in double quotes and double any embedded quote
+    return '"' + name.replace('"', '""') + '"'
+
 async def execute_query(query: str, conn_id: str, params=None):
     """
     Execute a read-only SQL query against the PostgreSQL database.
@@ -27,14 +88,17 @@ async def execute_query(query: str, conn_id: str, params=None):
         
     logger.info(f"Executing query on connection ID {conn_id}: {query}")
     
+    # Read-only mode comes from the pool's default_transaction_read_only server setting
     async with db.get_connection(conn_id) as conn:
-        # Ensure we're in read-only mode
-        await conn.execute("SET TRANSACTION READ ONLY")
-        
         # Execute the query
         try:
+            # conn.fetch already goes through asyncpg's per-connection prepared-statement cache
             records = await conn.fetch(query, *(params or []))
-            return [dict(record) for record in records]
+            if not records:
+                return []
+            # 컬럼 이름은 첫 행에서 한 번만 꺼내 모든 행에 재사용
+            cols = tuple(records[0].keys())
+            return [dict(zip(cols, record.values())) for record in records]
         except Exception as e:
             # Log the error but don't couple to specific error types
             logger.error(f"Query execution error: {e}")
@@ -75,9 +139,98 @@ def register_query_tools():
         """
         # Prepend EXPLAIN to the query
         explain_query = f"EXPLAIN (FORMAT JSON) {query}"
+
+        db = mcp.state["db"]
+        if not db:
+            raise ValueError("Database connection not available in MCP state.")
+
+        logger.info(f"Explaining query on connection ID {conn_id}: {query}")
+
+        # EXPLAIN returns a single row with a single column, so fetch that value directly
+        # instead of materializing the result as a list of dicts
+        async with db.get_connection(conn_id) as conn:
+            try:
+                plan = await conn.fetchval(explain_query, *(params or []))
+            except Exception as e:
+                logger.error(f"Query execution error: {e}")
+                raise
+
+        # Return the complete result
+        return [{"QUERY PLAN": plan}]
+
+    @mcp.tool()
+    async def pg_catalog_bulk(conn_id: str, schema: str = "public", table_name: str | None = None):
+        """
+        Fetch schemas, tables, table metadata, column metadata and estimated row count in one query.
         
-        # Execute the explain query
-        result = await execute_query(explain_query, conn_id, params)
+        Args:
+            conn_id: Connection ID previously obtained from the connect tool
+            schema: Schema to list tables from and where the table is located
+            table_name: Table to return metadata for (optional; without it only schemas and tables are filled)
+            
+        Returns:
+            Dictionary with schemas, tables, table_meta, columns and row_count
+            (row_count is the planner estimate from pg_class.reltuples, None if never analyzed)
+        """
+        db = mcp.state["db"]
+        if not db:
+            raise ValueError("Database connection not available in MCP state.")
+
+        logger.info(f"Fetching catalog of {schema}.{table_name} on connection ID {conn_id}")
+
+        async with db.get_connection(conn_id) as conn:
+            try:
+                record = await conn.fetchrow(_SQL_CATALOG_BULK, schema, table_name)
+            except Exception as e:
+                logger.error(f"Query execution error: {e}")
+                raise
+
+        # jsonb 컬럼은 텍스트로 오므로 여기서 디코딩
+        table_meta = record["table_meta"]
+        return {
+            "schemas": orjson.loads(record["schemas"]),
+            "tables": orjson.loads(record["tables"]),
+            "table_meta": orjson.loads(table_meta) if table_meta is not None else None,
+            "columns": orjson.loads(record["columns"]),
+            "row_count": record["row_count"],
+        }
+
+    @mcp.tool()
+    async def pg_count_table_rows(table_name: str, conn_id: str, schema: str = "public", exact: bool = False):
+        """
+        Get the number of rows in a table.
         
-        # Return the complete result
-        return result
\ No newline at end of file
+        By default this is the planner's estimate from pg_class.reltuples, which is
+        instant but only as fresh as the last ANALYZE/VACUUM. Set exact to run COUNT(*),
+        which scans the whole table.
+        
+        Args:
+            table_name: Table to count rows from
+            conn_id: Connection ID previously obtained from the connect tool
+            schema: Schema where the table is located
+            exact: Count exactly with COUNT(*) instead of returning the estimate
+            
+        Returns:
+            Dictionary with row_count and estimated (True when row_count is the planner estimate)
+        """
+        db = mcp.state["db"]
+        if not db:
+            raise ValueError("Database connection not available in MCP state.")
+
+        logger.info(f"Counting rows of {schema}.{table_name} on connection ID {conn_id} (exact={exact})")
+
+        async with db.get_connection(conn_id) as conn:
+            try:
+                if not exact:
+                    estimate = await conn.fetchval(_SQL_ESTIMATE_ROWS, schema, table_name)
+                    # ANALYZE 전이거나 테이블이 없으면 추정치가 없으므로 COUNT(*)로 넘어감
+                    if estimate is not None:
+                        return {"row_count": estimate, "estimated": True}
+                count = await conn.fetchval(
+                    f"SELECT COUNT(*) FROM {_quote_ident(schema)}.{_quote_ident(table_name)}"
+                )
+            except Exception as e:
+                logger.error(f"Query execution error: {e}")
+                raise
+
+        return {"row_count": count, "estimated": False}